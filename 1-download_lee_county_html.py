@@ -1,12 +1,20 @@
 import requests
 import json
 import os
+import argparse
+import importlib
+import multiprocessing
+import queue
+import threading
 import backoff
 import time
 from tqdm import tqdm
 import pandas as pd
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+# Stage 2, used by --fuse to parse pages as they are downloaded
+STAGE2_MODULE = "2-data_from_html_folder_to_raw_json_data"
+
 
 class AccessDeniedRetryable(requests.exceptions.RequestException):
     pass
@@ -21,7 +29,7 @@ class AccessDeniedRetryable(requests.exceptions.RequestException):
     backoff.expo,
     max_tries=5,
 )
-def scrape_full_parcel(url, folio_id=None):
+def scrape_full_parcel(url, folio_id=None, html_folder="lee_output", on_page=None):
     headers = {
         "User-Agent": "curl/7.79.1",  # mimic curl
         "Accept": "*/*",
@@ -33,23 +41,27 @@ def scrape_full_parcel(url, folio_id=None):
         raise AccessDeniedRetryable("Access Denied")
 
     html_content = response.content
-    os.makedirs("lee_output", exist_ok=True)
 
     # save locally
-    html_file_path = os.path.join("lee_output", f"{folio_id}.html")
-    with open(html_file_path, "wb") as f:
-        f.write(html_content)
+    if html_folder:
+        os.makedirs(html_folder, exist_ok=True)
+        html_file_path = os.path.join(html_folder, f"{folio_id}.html")
+        with open(html_file_path, "wb") as f:
+            f.write(html_content)
 
+    # hand the page over in memory (see download_and_parse)
+    if on_page is not None:
+        on_page(folio_id, html_content)
 
     return folio_id
 
-def download_html_data(folio_ids, max_threads=10):
+def download_html_data(folio_ids, max_threads=10, html_folder="lee_output", on_page=None):
     base_url = "https://www.leepa.org/Display/DisplayParcel.aspx?FolioID={}&AuthDetails=True&PropertyDetailsCurrent=True&historyDetails=True&SalesDetails=True&PermitDetails=True&RenumberDetails=True&GarbageDetails=True&ElevationDetails=True&RPDetails=True"
 
     def download_and_store(folio_id):
         try:
             url = base_url.format(folio_id)
-            result = scrape_full_parcel(url, folio_id)
+            result = scrape_full_parcel(url, folio_id, html_folder, on_page)
 
             return result
         except Exception as e:
@@ -66,16 +78,99 @@ def download_html_data(folio_ids, max_threads=10):
         for future in tqdm(as_completed(futures), total=len(futures), desc="Scraping Progress"):
             future.result()
 
+def download_and_parse(folio_ids, json_folder, csv_path, max_threads=10, processes=0, html_folder=None,
+                       max_tasks=500, max_rss_mb=0, timeout=300):
+    """
+    Fused stage 1 + 2: every downloaded page is handed in memory to stage 2's
+    WorkerPool running parse_tables, and its <folio>.json is written as soon as it is
+    parsed, so parsing overlaps the network wait and pages are never re-read from
+    disk. Workers are recycled and time out as in stage 2 (`max_tasks`, `max_rss_mb`,
+    `timeout`); a page that fails, hangs or kills its worker is saved to stage 2's
+    failed folder. HTML is only saved when `html_folder` is given. Returns the
+    failed folio IDs.
+    """
+    stage2 = importlib.import_module(STAGE2_MODULE)
+    lookup_path = stage2.compile_folio_lookup(csv_path, f"{os.path.splitext(csv_path)[0]}.folios.sqlite")
+    os.makedirs(json_folder, exist_ok=True)
+    os.makedirs(stage2.FAILED_FOLDER, exist_ok=True)
+    sink = stage2.FolderSink(json_folder)
+    output_options = {"sink": "files"}
+    processes = processes or max(1, os.cpu_count() - 1)
+
+    # Bounds the pages held in memory while the pool is behind the downloads
+    pages = queue.Queue(maxsize=processes * 4)
+    failed = []
+
+    def on_page(folio_id, html):
+        pages.put((str(folio_id), html, lookup_path, output_options))
+
+    def download():
+        try:
+            download_html_data(folio_ids, max_threads, html_folder, on_page)
+        finally:
+            pages.put(None)
+
+    downloader = threading.Thread(target=download, daemon=True)
+    downloader.start()
+
+    # Spawned, not forked, workers: the download threads are already running
+    pool = stage2.WorkerPool(processes, max_tasks, max_rss_mb, timeout, context=multiprocessing.get_context("spawn"))
+    for task, outcome, error in pool.imap_unordered(stage2.process_html_page, iter(pages.get, None)):
+        folio_id, html = task[0], task[1]
+        if error is None:
+            _, payload, _, error = outcome
+        if error is None:
+            sink.write(folio_id, payload)
+            continue
+        # Parsing failed, timed out or killed the worker; keep the page for a rerun
+        print(f"Parsing failed for {folio_id}: {error}")
+        with open(os.path.join(stage2.FAILED_FOLDER, f"{folio_id}.html"), "wb") as f:
+            f.write(html)
+        failed.append(folio_id)
+    downloader.join()
+    return failed
+
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Download Lee County parcel pages.')
+    parser.add_argument('--csv', default="lee_input.csv", help='CSV with a FolioID column')
+    parser.add_argument('--fuse', action='store_true',
+                        help='Parse pages with stage 2 as they download and write JSON directly')
+    parser.add_argument('--json-output', default="lee_json", help='Output folder for JSON files with --fuse')
+    parser.add_argument('--keep-html', action='store_true', help='With --fuse, also save the HTML to lee_output')
+    parser.add_argument('--processes', type=int, default=0,
+                        help='Parser processes with --fuse (0 for CPU count - 1)')
+    parser.add_argument('--max-tasks-per-child', type=int, default=500,
+                        help='With --fuse, replace a parser process after this many pages (0 for never)')
+    parser.add_argument('--max-worker-rss-mb', type=int, default=0,
+                        help='With --fuse, replace a parser process once its resident memory exceeds this many MiB '
+                             '(0 for no limit)')
+    parser.add_argument('--file-timeout', type=int, default=300,
+                        help='With --fuse, seconds a single page may take before it is saved to failed_data '
+                             '(0 for no limit)')
+    args = parser.parse_args()
 
     start_time = time.time()
-    df = pd.read_csv("lee_input.csv", dtype=str)
+    df = pd.read_csv(args.csv, dtype=str)
     df["FolioID"] = df["FolioID"].astype(str)
     df.set_index("FolioID", inplace=True)
     folio_ids = df.index.tolist()
     print(f"Loaded {len(folio_ids)} folio IDs from file.")
-    download_html_data(folio_ids, max_threads=30)
+    if args.fuse:
+        # Parser workers send their log records to stage 2's listener in this process
+        stage2 = importlib.import_module(STAGE2_MODULE)
+        log_listener = stage2.start_logging()
+        try:
+            failed = download_and_parse(folio_ids, args.json_output, args.csv, max_threads=30,
+                                        processes=args.processes,
+                                        html_folder="lee_output" if args.keep_html else None,
+                                        max_tasks=args.max_tasks_per_child, max_rss_mb=args.max_worker_rss_mb,
+                                        timeout=args.file_timeout)
+        finally:
+            stage2.stop_logging(log_listener)
+        print(f"Parsed pages written to {args.json_output}; {len(failed)} could not be parsed (saved to failed_data).")
+    else:
+        download_html_data(folio_ids, max_threads=30)
     # Scrape data using threading
     # scrape_multiple_parcels(folio_ids, df, max_threads=20)
     end_time = time.time()
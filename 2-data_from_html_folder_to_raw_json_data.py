@@ -1,18 +1,46 @@
 #!/usr/bin/env python3
 import os
+import csv
+import glob
+import gzip
+import hashlib
 import json
+import pickle
+import queue
 import re
-import shutil
-import pandas as pd
+import sqlite3
+import tarfile
+import time
+import tracemalloc
+import heapq
+from pathlib import Path
+import bs4
 from bs4 import BeautifulSoup
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.connection import wait
 from tqdm import tqdm
 from urllib.parse import urljoin
 import multiprocessing
 import argparse
 import logging
-import traceback
-from functools import lru_cache
+import logging.handlers
+from functools import lru_cache, wraps
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pc = pq = None
 
 # Configuration
 DEFAULT_INPUT_FOLDER = 'test_770'
@@ -20,17 +48,185 @@ DEFAULT_OUTPUT_FOLDER = 'test_770/'
 DEFAULT_CSV_PATH = '../data/test.csv'
 FAILED_FOLDER = "failed_data"
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("data_extraction.log"),
-        logging.StreamHandler()
-    ]
-)
+# Page files stage 2 reads, and the separator between a .tar archive and one of its members
+PAGE_SUFFIXES = (".html", ".html.gz", ".html.zst")
+TAR_MEMBER_SEPARATOR = "::"
+
+SHARD_INDEX_FILE = "index.csv"
+MANIFEST_FILE = "manifest.sqlite"
+
+# Columns of the county CSV that parse_tables reads for each folio
+LOOKUP_COLUMNS = ["STRAP", "OwnerName", "Others", "OwnerAddress1", "OwnerCity", "OwnerZip", "OwnerState"]
+
+# Cells of the generic section tables that are dropped, and row values that don't count as data
+EXCLUDED_CELL_TEXT = re.compile("|".join(map(re.escape, ["View Recorded Plat at LeeClerk.org",
+                                                         "freeProperty Fraud Alert"])))
+PLACEHOLDER_VALUES = frozenset(["", ".", "-", "N/A"])
+
+# How far around a photo to look for its "Photo Date" caption
+PHOTO_DATE_WINDOW = 4
+PHOTO_DATE_DEPTH = 3
+
+# Logging: records go to a queue drained by one listener in the parent; pool workers
+# send theirs to the parent over their own task pipe
+LOG_FILE = "data_extraction.log"
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# Warnings and errors let through per logging call site and interval; the rest are counted
+LOG_REPEAT_LIMIT = 20
+LOG_REPEAT_INTERVAL = 60
+
 logger = logging.getLogger(__name__)
 
+class RepeatLimitingHandler(logging.Handler):
+    """
+    Forward records to `handlers`, letting through at most `limit` warnings or
+    errors per logging call site every `interval` seconds. Suppressed records are
+    counted and summarised once the interval ends or the handler is closed, so a
+    systematic failure costs a few lines instead of one per file.
+    """
+
+    def __init__(self, handlers, limit=LOG_REPEAT_LIMIT, interval=LOG_REPEAT_INTERVAL):
+        super().__init__()
+        self.handlers = handlers
+        self.limit = limit
+        self.interval = interval
+        self.window_start = time.monotonic()
+        self.counts = {}
+
+    def emit(self, record):
+        if time.monotonic() - self.window_start >= self.interval:
+            self.flush_suppressed()
+        if self.limit and record.levelno >= logging.WARNING:
+            count = self.counts.setdefault((record.pathname, record.lineno), [0, 0, None])
+            count[0] += 1
+            if count[0] > self.limit:
+                count[1] += 1
+                count[2] = record
+                return
+        self.forward(record)
+
+    def forward(self, record):
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def flush_suppressed(self):
+        for _, suppressed, last in self.counts.values():
+            if suppressed:
+                message = f"{suppressed} more like this suppressed, latest: {last.getMessage().splitlines()[0]}"
+                self.forward(logging.LogRecord(last.name, last.levelno, last.pathname, last.lineno, message, None, None))
+        self.counts = {}
+        self.window_start = time.monotonic()
+
+    def close(self):
+        self.flush_suppressed()
+        for handler in self.handlers:
+            handler.close()
+        super().close()
+
+
+class PipeLogHandler(logging.handlers.QueueHandler):
+    """
+    Sends a pool worker's log records to the parent over the worker's task pipe.
+    Killing a worker mid-send only damages its own pipe, which the pool discards
+    with it; a queue shared by all workers could be left locked or corrupted.
+    """
+
+    def enqueue(self, record):
+        self.queue.send(("log", record))
+
+
+def start_logging(log_file=LOG_FILE):
+    """
+    Route this process's logging through a queue and start the listener that
+    writes it to `log_file` and the console. Returns the listener.
+    """
+    log_queue = queue.Queue()
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.FileHandler(log_file), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    listener = logging.handlers.QueueListener(log_queue, RepeatLimitingHandler(handlers))
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(logging.INFO)
+    listener.start()
+    return listener
+
+
+def stop_logging(listener):
+    """Drain the log queue and flush suppressed-record summaries."""
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+def configure_worker_logging(conn):
+    """Send this worker's log records to the pool over `conn`."""
+    root = logging.getLogger()
+    root.handlers = [PipeLogHandler(conn)]
+    root.setLevel(logging.INFO)
+
+
+# Per-file {name: [seconds, peak bytes, calls]} collected in a worker while --profile is on
+_file_profile = None
+
+
+def profiled(func):
+    """Record the time and peak allocations of `func` in the current file's profile."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if _file_profile is None:
+            return func(*args, **kwargs)
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            entry = _file_profile.setdefault(func.__qualname__, [0.0, 0, 0])
+            entry[0] += time.perf_counter() - start
+            entry[1] = max(entry[1], tracemalloc.get_traced_memory()[1] - base)
+            entry[2] += 1
+    return wrapper
+
+
+class Stage2Profile:
+    """Aggregates the per-file profiles returned by the workers."""
+
+    def __init__(self, top=10):
+        self.top = top
+        self.sections = {}
+        self.slowest = []
+        self.files = 0
+        self.total_seconds = 0.0
+
+    def add(self, folio_id, stats):
+        for name, (seconds, peak, calls) in stats["sections"].items():
+            entry = self.sections.setdefault(name, [0.0, 0, 0])
+            entry[0] += seconds
+            entry[1] = max(entry[1], peak)
+            entry[2] += calls
+        self.files += 1
+        self.total_seconds += stats["seconds"]
+        heapq.heappush(self.slowest, (stats["seconds"], folio_id, stats["page_bytes"]))
+        if len(self.slowest) > self.top:
+            heapq.heappop(self.slowest)
+
+    def report(self):
+        """Log the profile as one record, so the queued log output can't interleave with the table."""
+        lines = [f"Stage-2 profile: {self.files} files, {self.total_seconds:.2f}s of worker time",
+                 f"{'extractor':<40} {'total s':>9} {'share':>7} {'calls':>8} {'mean ms':>9} {'peak KiB':>9}"]
+        for name, (seconds, peak, calls) in sorted(self.sections.items(), key=lambda item: -item[1][0]):
+            share = seconds / self.total_seconds * 100 if self.total_seconds else 0.0
+            lines.append(f"{name:<40} {seconds:>9.2f} {share:>6.1f}% {calls:>8} "
+                         f"{seconds / calls * 1000:>9.2f} {peak / 1024:>9.0f}")
+        lines += ["", f"Slowest {len(self.slowest)} files", f"{'folio':<20} {'seconds':>9} {'page KiB':>9}"]
+        for seconds, folio_id, page_bytes in sorted(self.slowest, reverse=True):
+            lines.append(f"{folio_id:<20} {seconds:>9.3f} {page_bytes / 1024:>9.0f}")
+        logger.info("\n".join(lines))
+
+@profiled
 def extract_property_details(soup):
     data = {}
     box = soup.find("div", id="PropertyDetailsCurrent")
@@ -75,6 +271,42 @@ def extract_property_details(soup):
     return data
 
 
+def find_photo_date(img, boundary=None, window=PHOTO_DATE_WINDOW, depth=PHOTO_DATE_DEPTH):
+    """Return the "Photo Date" line closest to a photo <img>, or None.
+
+    The few <div>s that follow the image inside `boundary` are tried first, so
+    a caption after the photo wins over other photos' captions. Failing that,
+    only the first <div>s inside the image's wrapper and the few <div>s that
+    follow it are inspected, widening to the enclosing <div> up to `depth`
+    times without leaving `boundary`, so the cost does not grow with the page.
+    """
+    for div in img.find_all_next("div", limit=window):
+        if boundary is not None and not any(parent is boundary for parent in div.parents):
+            break
+        for line in div.get_text(separator="\n", strip=True).split("\n"):
+            if "Photo Date" in line:
+                return line.strip()
+
+    node = img.find_parent("div")
+    for _ in range(depth):
+        if node is None:
+            break
+        inside = boundary is None or node is boundary or any(parent is boundary for parent in node.parents)
+        if not inside:
+            break
+        candidates = node.find_all("div", limit=window)
+        if node is not boundary:
+            candidates += node.find_next_siblings("div", limit=window)
+        for div in candidates:
+            for line in div.get_text(separator="\n", strip=True).split("\n"):
+                if "Photo Date" in line:
+                    return line.strip()
+        if node is boundary:
+            break
+        node = node.find_parent("div")
+    return None
+
+
 def extract_unit_subareas_and_photos(unit_table, base_url="https://www.leepa.org"):
     rows = unit_table.find_all("tr")
     unit_subareas = []
@@ -101,15 +333,9 @@ def extract_unit_subareas_and_photos(unit_table, base_url="https://www.leepa.org
                         photos["Building Front Photo"] = full_url
 
                         # Try to get the date from the div nearby
-                        photo_wrapper = img.find_parent("div")
-                        if photo_wrapper:
-                            # Search through all subsequent <div>s to find the "Photo Date"
-                            for div in photo_wrapper.find_all_next("div"):
-                                text = div.get_text(separator="\n", strip=True)
-                                for line in text.split("\n"):
-                                    if "Photo Date" in line:
-                                        photos["Building Photo Date"] = line.strip()
-                                        break
+                        photo_date = find_photo_date(img, boundary=rows[k])
+                        if photo_date:
+                            photos["Building Photo Date"] = photo_date
 
                     elif "FloorPlan" in src:
                         photos["Unit Footprint"].append(urljoin(base_url, src))
@@ -124,6 +350,7 @@ def extract_unit_subareas_and_photos(unit_table, base_url="https://www.leepa.org
     return unit_subareas, photos
 
 
+@profiled
 def extract_alternate_address_info(section):
     data = {}
     # Try to find a table inside this section if available
@@ -142,6 +369,7 @@ def extract_alternate_address_info(section):
     return data
 
 
+@profiled
 def extract_buildings_info(section, base_url):
     buildings = []
     current_building = None
@@ -257,6 +485,7 @@ def extract_buildings_info(section, base_url):
     return buildings
 
 
+@profiled
 def extract_condo_info(section, base_url="https://www.leepa.org"):
     data = {}
 
@@ -339,14 +568,9 @@ def extract_condo_info(section, base_url="https://www.leepa.org"):
                 full_url = urljoin(base_url, src)
                 if "photo.aspx" in src:
                     photos["Building Front Photo"] = full_url
-                    date_div = img.find_parent("div")
-                    if date_div:
-                        for div in date_div.find_all_next("div"):
-                            text = div.get_text(separator="\n", strip=True)
-                            for line in text.split("\n"):
-                                if "Photo Date" in line:
-                                    photos["Building Photo Date"] = line.strip()
-                                    break
+                    photo_date = find_photo_date(img, boundary=img_section)
+                    if photo_date:
+                        photos["Building Photo Date"] = photo_date
                 elif "FloorPlan" in src:
                     photos["Unit Footprint"].append(full_url)
 
@@ -381,6 +605,7 @@ def extract_links_from_cell(cell, base_url="https://www.leepa.org"):
     return links
 
 
+@profiled
 def extract_flood_and_storm_info(soup):
     data = {}
     flood_box = soup.find("div", id="ElevationDetails")
@@ -412,6 +637,7 @@ def extract_flood_and_storm_info(soup):
     return data
 
 
+@profiled
 def extract_real_property_tag_info(soup):
     rp_div = soup.find("div", id="RPDetails")
     if not rp_div:
@@ -443,6 +669,7 @@ def extract_real_property_tag_info(soup):
     return tag_entries
 
 
+@profiled
 def extract_garbage_details(soup):
     data = {}
     garbage_div = soup.find("div", id="GarbageDetails")
@@ -470,6 +697,7 @@ def extract_garbage_details(soup):
     return data
 
 
+@profiled
 def extract_property_attributes(soup):
     data = {}
     description_panel = None
@@ -536,6 +764,54 @@ def extract_property_attributes(soup):
     return data
 
 
+@profiled
+def extract_table_section(box):
+    """Generic extraction of every table in a section box into a list of row dicts."""
+    section_data = []
+    # Only cells that contain a link are scanned for links
+    linked_cells = {id(parent) for a in box.find_all("a", href=True)
+                    for parent in a.parents if parent.name in ("td", "th")}
+    for table in box.find_all("table"):
+        headers = []
+        rows = table.find_all("tr")
+        if not rows:
+            continue
+
+        first_row_ths = rows[0].find_all("th")
+        start_index = 1 if first_row_ths else 0
+        if first_row_ths:
+            headers = [th.get_text(strip=True) for th in first_row_ths]
+
+        for row in rows[start_index:]:
+            cells = row.find_all(["td", "th"])
+            cell_values = [cell.get_text(strip=True) for cell in cells]
+            if not any(cell_values):
+                continue
+
+            row_dict = {}
+            for col_idx, (cell, text) in enumerate(zip(cells, cell_values)):
+                if EXCLUDED_CELL_TEXT.search(text):
+                    continue
+                header = headers[col_idx] if col_idx < len(headers) else f"Col_{col_idx}"
+                row_dict[header] = text
+
+                if id(cell) in linked_cells:
+                    links = extract_links_from_cell(cell)
+                    if links:
+                        row_dict[f"{header}_Links"] = links
+
+            if any(v not in PLACEHOLDER_VALUES for v in row_dict.values() if isinstance(v, str)):
+                section_data.append(row_dict)
+    return section_data
+
+
+@profiled
+def find_condo_section(soup):
+    condo_sections = soup.select("div.innerBox:has(div.sectionSubTitle:contains('Condominium'))")
+    return condo_sections[0] if condo_sections else None
+
+
+@profiled
 def extract_address_history(soup):
     table = soup.find("table", class_="detailsTable")
     results = []
@@ -581,7 +857,7 @@ def get_owner_details(soup):
     return {}, ""
 
 
-def parse_tables(soup, df=None, folio_id=None):
+def parse_tables(soup, lookup=None, folio_id=None):
     results = {}
     results["Property Description"] = extract_property_attributes(soup)
 
@@ -615,12 +891,14 @@ def parse_tables(soup, df=None, folio_id=None):
                 except:
                     pass
 
-            # Fallback to passed-in folio_id and lookup in df if needed
+            # Fallback to passed-in folio_id and lookup in the county data if needed
             if not extracted_folio:
                 extracted_folio = folio_id
 
-            if (not strap or strap.lower() == 'none') and df is not None and extracted_folio in df.index:
-                strap = df.loc[extracted_folio].get("STRAP", "").strip()
+            if (not strap or strap.lower() == 'none') and lookup is not None:
+                row = lookup.get(extracted_folio)
+                if row:
+                    strap = (row["STRAP"] or "").strip()
 
             results["Property Data"] = {
                 "STRAP": strap,
@@ -631,41 +909,7 @@ def parse_tables(soup, df=None, folio_id=None):
             }
             continue
 
-        section_data = []
-        for table in box.find_all("table"):
-            headers = []
-            rows = table.find_all("tr")
-            if not rows:
-                continue
-
-            first_row_ths = rows[0].find_all("th")
-            start_index = 1 if first_row_ths else 0
-            if first_row_ths:
-                headers = [th.get_text(strip=True) for th in first_row_ths]
-
-            for row in rows[start_index:]:
-                cells = row.find_all(["td", "th"])
-                cell_values = [td.get_text(strip=True) for td in cells]
-                if not any(cell_values):
-                    continue
-
-                row_dict = {}
-                for col_idx, cell in enumerate(cells):
-                    header = headers[col_idx] if col_idx < len(headers) else f"Col_{col_idx}"
-                    text = cell.get_text(strip=True)
-                    if any(excluded_text in text for excluded_text in
-                           ["View Recorded Plat at LeeClerk.org", "freeProperty Fraud Alert"]):
-                        continue
-                    row_dict[header] = text
-
-                    links = extract_links_from_cell(cell)
-
-                    if links:
-                        row_dict[f"{header}_Links"] = links
-
-                if any(v.strip() not in ["", ".", "-", "N/A"] for v in row_dict.values() if isinstance(v, str)):
-                    section_data.append(row_dict)
-
+        section_data = extract_table_section(box)
         if section_data:
             results[section_name] = section_data
     garbage_info = extract_garbage_details(soup)
@@ -683,29 +927,28 @@ def parse_tables(soup, df=None, folio_id=None):
     if "Property Data" in results:
         try:
             folio_id = results["Property Data"].get("Folio ID")
-            if folio_id and folio_id in df.index:
-                row = df.loc[folio_id]
-                results["Property Data"]["STRAP"] = row.get("STRAP", "")
+            row = lookup.get(folio_id) if folio_id and lookup is not None else None
+            if row:
+                results["Property Data"]["STRAP"] = row["STRAP"] or ""
                 results["Property Data"]["Folio ID"] = str(folio_id)
-                owner1 = row.get("OwnerName", "")
-                owner2 = row.get("Others", "")
+                owner1 = row["OwnerName"]
+                owner2 = row["Others"]
 
                 owner_list = []
-                if pd.notna(owner1) and owner1.strip():
+                if owner1 and owner1.strip():
                     owner_list.append(owner1.strip())
-                if pd.notna(owner2) and owner2.strip():
+                if owner2 and owner2.strip():
                     owner_list.append(owner2.strip())
 
                 results["Property Data"]["Owner of Record"] = owner_list
 
+                address_parts = (row["OwnerAddress1"] or "").split()
                 results["Property Data"]["Owner Address"] = {
-                    "Street Number": row.get("OwnerAddress1", "").split()[0] if pd.notna(
-                        row.get("OwnerAddress1", "")) else "",
-                    "Street Name": " ".join(row.get("OwnerAddress1", "").split()[1:]) if pd.notna(
-                        row.get("OwnerAddress1", "")) else "",
-                    "City": row.get("OwnerCity", ""),
-                    "Zip": row.get("OwnerZip", ""),
-                    "state": row.get("OwnerState", "")
+                    "Street Number": address_parts[0] if address_parts else "",
+                    "Street Name": " ".join(address_parts[1:]),
+                    "City": row["OwnerCity"] or "",
+                    "Zip": row["OwnerZip"] or "",
+                    "state": row["OwnerState"] or ""
                 }
         except Exception as e:
             logger.error(f"Error using CSV data for folio {folio_id}: {e}")
@@ -719,53 +962,607 @@ def parse_tables(soup, df=None, folio_id=None):
         if buildings:
             results["Property Details"].update({"Building Info": buildings})
 
-    condo_sections = soup.select("div.innerBox:has(div.sectionSubTitle:contains('Condominium'))")
-    if condo_sections:
-        results["Property Details"].update({"Condominium": extract_condo_info(condo_sections[0])})
+    condo_section = find_condo_section(soup)
+    if condo_section:
+        results["Property Details"].update({"Condominium": extract_condo_info(condo_section)})
 
     return results
 
 
-def load_dataframe(csv_path):
-    """Load and prepare the dataframe from CSV."""
+def compile_folio_lookup(csv_path, db_path):
+    """
+    Compile the LOOKUP_COLUMNS of the county CSV into a SQLite file keyed by FolioID.
+    The file is only rebuilt when the CSV is newer than it.
+    """
+    if os.path.exists(db_path) and os.path.getmtime(db_path) >= os.path.getmtime(csv_path):
+        return db_path
+
+    tmp_path = f"{db_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    columns = ", ".join(f'"{column}" TEXT' for column in LOOKUP_COLUMNS)
+    placeholders = ", ".join("?" for _ in range(len(LOOKUP_COLUMNS) + 1))
+    conn = sqlite3.connect(tmp_path)
     try:
-        df = pd.read_csv(csv_path, dtype=str)
-        df["FolioID"] = df["FolioID"].astype(str)
-        df.set_index("FolioID", inplace=True)
-        return df
-    except Exception as e:
-        logger.error(f"Error loading CSV file {csv_path}: {e}")
-        return pd.DataFrame()
+        conn.execute(f"CREATE TABLE folios (FolioID TEXT PRIMARY KEY, {columns}) WITHOUT ROWID")
+        with open(csv_path, newline="", encoding="utf-8-sig") as f:
+            rows = (
+                (row["FolioID"], *[row.get(column) or None for column in LOOKUP_COLUMNS])
+                for row in csv.DictReader(f)
+            )
+            conn.executemany(f"INSERT OR IGNORE INTO folios VALUES ({placeholders})", rows)
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, db_path)
+    return db_path
+
+
+class FolioLookup:
+    """
+    Read-only, memory-mapped view of a compiled folio lookup file. Every worker
+    opens the same file, so the rows live once in the OS page cache instead of
+    once per process.
+    """
+
+    def __init__(self, db_path):
+        uri = f"{Path(db_path).resolve().as_uri()}?mode=ro&immutable=1"
+        self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA mmap_size = 1073741824")
+
+    @profiled
+    def get(self, folio_id):
+        """Return the row for `folio_id` as a dict, or None if it is unknown."""
+        row = self.conn.execute("SELECT * FROM folios WHERE FolioID = ?", (str(folio_id),)).fetchone()
+        return dict(row) if row else None
 
 
 @lru_cache(maxsize=1)
-def get_dataframe(csv_path):
-    """Cached dataframe to avoid reloading in each process."""
-    return load_dataframe(csv_path)
+def get_folio_lookup(db_path):
+    """Cached lookup to avoid reopening it for every file in a process."""
+    if not db_path:
+        return None
+    try:
+        return FolioLookup(db_path)
+    except sqlite3.Error as e:
+        logger.error(f"Error opening folio lookup {db_path}: {e}")
+        return None
+
+
+def serialize_result(data, compact=False):
+    """
+    Encode extracted data as UTF-8 JSON bytes, using orjson when it is installed.
+    Non-ASCII text is written as UTF-8 rather than \\u escapes, which orjson
+    cannot produce, so both encoders give the same bytes.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=0 if compact else orjson.OPT_INDENT_2)
+    if compact:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def flatten_result(folio_id, data):
+    """Project the scalar fields of each top-level section into one flat row."""
+    row = {"folio_id": folio_id}
+    for section, values in data.items():
+        if isinstance(values, dict):
+            for key, value in values.items():
+                if isinstance(value, str):
+                    row[f"{section}.{key}"] = value
+    return row
+
+
+@profiled
+def encode_result(folio_id, data, output_options):
+    """Serialize extracted data for the configured sink; returns (payload, flat_row)."""
+    if output_options.get("sink") == "jsonl":
+        payload = serialize_result(data, compact=True) + b"\n"
+        if output_options.get("compression") == "gzip":
+            payload = gzip.compress(payload)
+    else:
+        payload = serialize_result(data, output_options.get("compact", False))
+    flat_row = flatten_result(folio_id, data) if output_options.get("parquet") else None
+    return payload, flat_row
+
+
+class FolderSink:
+    """Writes one JSON file per folio into the output folder."""
+
+    def __init__(self, output_folder):
+        self.output_folder = output_folder
+
+    def write(self, folio_id, payload, flat_row=None):
+        output_path = os.path.join(self.output_folder, f"{folio_id}.json")
+        with open(output_path, "wb") as f:
+            f.write(payload)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ShardedJsonlSink:
+    """
+    Appends results to rolling JSONL shards (part-00000.jsonl.gz, ...) and records
+    folio -> shard, offset and length in index.csv. When compressed, every record
+    is its own gzip member: shards still stream with gzip.open, and a single
+    record can be read back by seeking to its offset and decompressing `length`
+    bytes. With `parquet`, the flat fields of each shard are also written to a
+    matching part-00000.parquet; on close, the rows of folios written again by
+    this run are dropped from the Parquet files of earlier runs, so the files
+    read as one dataset hold only the latest row of each folio.
+    """
+
+    def __init__(self, output_folder, shard_size=10000, compression="gzip", parquet=False):
+        self.output_folder = output_folder
+        self.shard_size = shard_size
+        self.suffix = ".jsonl.gz" if compression == "gzip" else ".jsonl"
+        self.parquet = parquet
+
+        # Continue numbering after shards left by earlier runs instead of overwriting them
+        existing = [int(m.group(1)) for m in (re.match(r"part-(\d+)\.", f) for f in os.listdir(output_folder)) if m]
+        self.shard_number = max(existing) + 1 if existing else 0
+        self.first_shard = self.shard_number
+        self.written = set()
+        self.shard_file = None
+        self.records_in_shard = 0
+        self.flat_rows = []
+
+        index_path = os.path.join(output_folder, SHARD_INDEX_FILE)
+        new_index = not os.path.exists(index_path)
+        self.index_file = open(index_path, "a", newline="", encoding="utf-8")
+        self.index_writer = csv.writer(self.index_file)
+        if new_index:
+            self.index_writer.writerow(["folio_id", "shard", "offset", "length"])
+
+    def shard_name(self, suffix=None):
+        return f"part-{self.shard_number:05d}{suffix or self.suffix}"
+
+    def write(self, folio_id, payload, flat_row=None):
+        if self.shard_file is None:
+            self.shard_file = open(os.path.join(self.output_folder, self.shard_name()), "wb")
+        offset = self.shard_file.tell()
+        self.shard_file.write(payload)
+        self.index_writer.writerow([folio_id, self.shard_name(), offset, len(payload)])
+        if flat_row is not None:
+            self.flat_rows.append(flat_row)
+            self.written.add(folio_id)
+
+        self.records_in_shard += 1
+        if self.records_in_shard >= self.shard_size:
+            self.roll()
+
+    def flush(self):
+        """
+        Write the current shard and index.csv through to disk, so records are
+        stored before the incremental manifest marks their pages as done.
+        """
+        for f in (self.shard_file, self.index_file):
+            if f is not None:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def roll(self):
+        """Close the current shard (and write its Parquet projection) and start a new one."""
+        if self.shard_file is None:
+            return
+        self.flush()
+        self.shard_file.close()
+        if self.parquet and self.flat_rows:
+            parquet_path = os.path.join(self.output_folder, self.shard_name(".parquet"))
+            # Columns are the union over the shard; records lacking a field get nulls
+            columns = dict.fromkeys(key for row in self.flat_rows for key in row)
+            schema = pa.schema([pa.field(column, pa.string()) for column in columns])
+            pq.write_table(pa.Table.from_pylist(self.flat_rows, schema=schema), parquet_path)
+
+        self.shard_file = None
+        self.records_in_shard = 0
+        self.flat_rows = []
+        self.shard_number += 1
+
+    def drop_superseded_rows(self):
+        """Remove the folios written by this run from the Parquet files of earlier runs."""
+        written = pa.array(sorted(self.written), pa.string())
+        for name in sorted(os.listdir(self.output_folder)):
+            match = re.match(r"part-(\d+)\.parquet$", name)
+            if not match or int(match.group(1)) >= self.first_shard:
+                continue
+            path = os.path.join(self.output_folder, name)
+            # Check the folio column alone; most files have nothing to drop
+            if not pc.any(pc.is_in(pq.read_table(path, columns=["folio_id"])["folio_id"], value_set=written)).as_py():
+                continue
+            table = pq.read_table(path)
+            table = table.filter(pc.invert(pc.is_in(table["folio_id"], value_set=written)))
+            pq.write_table(table, path + ".tmp")
+            os.replace(path + ".tmp", path)
+
+    def close(self):
+        self.roll()
+        if self.parquet and self.written and self.first_shard > 0:
+            self.drop_superseded_rows()
+        self.index_file.close()
+
+
+def extractor_fingerprint(output_options=None):
+    """
+    Fingerprint of the code and settings that shape every output: this script's
+    source, the BeautifulSoup version and the output options. The county CSV is
+    tracked per folio by Stage2Manifest instead.
+    """
+    digest = hashlib.sha256()
+    with open(os.path.abspath(__file__), "rb") as f:
+        digest.update(f.read())
+    digest.update(bs4.__version__.encode())
+    digest.update(json.dumps(output_options or {}, sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+def is_page(name):
+    return name.endswith(PAGE_SUFFIXES)
+
+
+def expand_inputs(inputs, locations=None):
+    """
+    Resolve --input values into page sources. Each value may be a folder, a page
+    file (.html, .html.gz, .html.zst), an uncompressed .tar of such pages, or a
+    glob pattern matching any of these. Tar members are addressed as
+    "archive.tar::member" and read in place by the workers; their (data offset,
+    size) in the archive are added to `locations`, so workers can seek straight
+    to them. Pages matched by more than one value are listed once; a value that
+    matches nothing is an error.
+    """
+    sources = []
+    for item in inputs:
+        if any(c in item for c in "*?["):
+            paths = sorted(glob.glob(item, recursive=True))
+            if not paths:
+                raise ValueError(f"{item}: pattern matches no files")
+        elif os.path.exists(item):
+            paths = [item]
+        else:
+            raise ValueError(f"{item}: no such file or directory")
+        for path in paths:
+            if os.path.isdir(path):
+                sources.extend(os.path.join(path, f) for f in sorted(os.listdir(path)) if is_page(f))
+            elif path.endswith(".tar"):
+                with tarfile.open(path, "r:") as tar:
+                    for member in tar:
+                        if member.isfile() and is_page(member.name):
+                            source = f"{path}{TAR_MEMBER_SEPARATOR}{member.name}"
+                            sources.append(source)
+                            if locations is not None:
+                                locations[source] = (member.offset_data, member.size)
+            elif is_page(path):
+                sources.append(path)
+            elif re.search(r"\.(tar\.\w+|tgz)$", path):
+                raise ValueError(f"{path}: compressed tarballs can't be read in place; "
+                                 "use a plain .tar of .html.gz or .html.zst pages instead")
+    # Overlapping values (a folder and a glob inside it, say) name the same page twice
+    unique = {}
+    for source in sources:
+        archive, separator, member = source.partition(TAR_MEMBER_SEPARATOR)
+        unique.setdefault(f"{os.path.abspath(archive)}{separator}{member}", source)
+    return list(unique.values())
+
+
+@lru_cache(maxsize=8)
+def tar_index(archive):
+    """
+    {member name: (data offset, size)} of an uncompressed tar, read once per
+    process; only for members whose location was not handed over.
+    """
+    with tarfile.open(archive, "r:") as tar:
+        return {member.name: (member.offset_data, member.size) for member in tar if member.isfile()}
+
+
+def read_source_bytes(source, location=None):
+    """
+    Bytes of a page file or tar member as stored, i.e. still compressed. For a tar
+    member, `location` is its (data offset, size), as found by expand_inputs.
+    """
+    archive, separator, member = source.partition(TAR_MEMBER_SEPARATOR)
+    if not separator:
+        with open(source, "rb") as f:
+            return f.read()
+    offset, size = location or tar_index(archive)[member]
+    with open(archive, "rb") as f:
+        f.seek(offset)
+        return f.read(size)
+
+
+def read_page(source, location=None):
+    """HTML of a page source, decompressing .gz and .zst pages."""
+    data = read_source_bytes(source, location)
+    if source.endswith(".gz"):
+        data = gzip.decompress(data)
+    elif source.endswith(".zst"):
+        data = zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return data.decode("utf-8")
+
+
+def source_name(source):
+    """File name of a page source, without the archive part."""
+    return os.path.basename(source.rpartition(TAR_MEMBER_SEPARATOR)[2])
+
+
+def source_folio_id(source):
+    name = source_name(source)
+    for suffix in PAGE_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return os.path.splitext(name)[0]
+
+
+def quarantine(source, failed_folder):
+    """Copy a page that could not be processed into `failed_folder`."""
+    try:
+        with open(os.path.join(failed_folder, source_name(source)), "wb") as f:
+            f.write(read_source_bytes(source))
+    except (OSError, KeyError) as e:
+        logger.error(f"Could not copy {source} to {failed_folder}: {e}")
+
+
+class Stage2Manifest:
+    """
+    Records the content hash, extractor fingerprint and folio lookup row hash of
+    every input that was processed successfully, so reruns only pick up new or
+    changed pages and pages whose row in the county CSV changed. Files whose size
+    and mtime are unchanged are not re-hashed.
+    """
+
+    def __init__(self, manifest_path, fingerprint, lookup=None):
+        self.fingerprint = fingerprint
+        self.lookup = lookup
+        self.conn = sqlite3.connect(manifest_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha256 TEXT, extractor TEXT, lookup TEXT)"
+        )
+        # Manifests written before the lookup column was added
+        if "lookup" not in {row[1] for row in self.conn.execute("PRAGMA table_info(files)")}:
+            self.conn.execute("ALTER TABLE files ADD COLUMN lookup TEXT")
+        self.pending = {}
+
+    def lookup_hash(self, filepath):
+        """Hash of the folio lookup row that parse_tables merges into this page's output."""
+        row = self.lookup.get(source_folio_id(filepath)) if self.lookup is not None else None
+        return hashlib.sha256(json.dumps(row, sort_keys=True).encode()).hexdigest()[:16]
+
+    def changed(self, filepaths):
+        """Return the subset of `filepaths` that needs (re)processing."""
+        known = {row[0]: row[1:] for row in self.conn.execute(
+            "SELECT path, size, mtime_ns, sha256, extractor, lookup FROM files")}
+        todo = []
+        for filepath in filepaths:
+            path = os.path.abspath(filepath)
+            # Tar members are only re-hashed when their archive changed
+            stat = os.stat(filepath.partition(TAR_MEMBER_SEPARATOR)[0])
+            lookup_hash = self.lookup_hash(filepath)
+            entry = known.get(path)
+            current = entry and entry[3] == self.fingerprint and entry[4] == lookup_hash
+            if current and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+                continue
+            sha256 = hashlib.sha256(read_source_bytes(filepath)).hexdigest()
+            if current and entry[2] == sha256:
+                # Touched but identical; remember the new stat so it is not hashed again
+                self.conn.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?",
+                                  (stat.st_size, stat.st_mtime_ns, path))
+                continue
+            self.pending[path] = (stat.st_size, stat.st_mtime_ns, sha256, lookup_hash)
+            todo.append(filepath)
+        self.conn.commit()
+        return todo
+
+    def record(self, filepath):
+        """Mark `filepath` as processed with the current extractor."""
+        path = os.path.abspath(filepath)
+        size, mtime_ns, sha256, lookup_hash = self.pending.pop(path)
+        self.conn.execute("INSERT OR REPLACE INTO files (path, size, mtime_ns, sha256, extractor, lookup) "
+                          "VALUES (?, ?, ?, ?, ?, ?)", (path, size, mtime_ns, sha256, self.fingerprint, lookup_hash))
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+@profiled
+def parse_html(html):
+    # Try to use lxml parser for better performance, fall back to html.parser if not available
+    try:
+        return BeautifulSoup(html, 'lxml')
+    except Exception as parser_error:
+        logger.warning(f"lxml parser not available, falling back to html.parser: {parser_error}")
+        return BeautifulSoup(html, 'html.parser')
 
 
 def process_html_file(args):
-    """Process a single HTML file and return the result data."""
-    filepath, csv_path, chunk_id = args
+    """Process a single HTML file and return the serialized result data."""
+    global _file_profile
+    filepath, lookup_path, chunk_id, output_options, profile, location = args
+    if profile:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _file_profile = {}
+    start = time.perf_counter()
     try:
-        # Get the dataframe (cached)
-        df = get_dataframe(csv_path)
+        # Get the folio lookup (cached)
+        lookup = get_folio_lookup(lookup_path)
         
-        with open(filepath, 'r', encoding='utf-8') as f:
-            html = f.read()
+        html = read_page(filepath, location)
         
-        # Try to use lxml parser for better performance, fall back to html.parser if not available
-        try:
-            soup = BeautifulSoup(html, 'lxml')
-        except Exception as parser_error:
-            logger.warning(f"lxml parser not available, falling back to html.parser: {parser_error}")
-            soup = BeautifulSoup(html, 'html.parser')
-        folio_id = os.path.splitext(os.path.basename(filepath))[0]
-        return folio_id, parse_tables(soup, df, folio_id=folio_id), None
+        soup = parse_html(html)
+        folio_id = source_folio_id(filepath)
+        payload, flat_row = encode_result(folio_id, parse_tables(soup, lookup, folio_id=folio_id), output_options)
+        stats = None
+        if profile:
+            stats = {"sections": _file_profile, "seconds": time.perf_counter() - start,
+                     "page_bytes": len(html.encode("utf-8"))}
+        return folio_id, payload, flat_row, None, stats
+    except Exception as e:
+        logger.error(f"Error processing file {filepath}: {e}", exc_info=True)
+        return source_name(filepath), {"error": str(e)}, None, filepath, None
+    finally:
+        _file_profile = None
+
+
+def process_html_page(args):
+    """
+    Process a page handed over in memory, e.g. by stage 1 as it downloads.
+    Returns (folio_id, payload, flat_row, error); payload is None when error is set.
+    """
+    folio_id, html, lookup_path, output_options = args
+    try:
+        if isinstance(html, bytes):
+            html = html.decode("utf-8")
+        soup = parse_html(html)
+        data = parse_tables(soup, get_folio_lookup(lookup_path), folio_id=folio_id)
+        payload, flat_row = encode_result(folio_id, data, output_options)
+        return folio_id, payload, flat_row, None
     except Exception as e:
-        logger.error(f"Error processing file {filepath}: {e}")
-        print(traceback.format_exc())
-        return os.path.basename(filepath), {"error": str(e)}, filepath
+        logger.error(f"Error processing page {folio_id}: {e}", exc_info=True)
+        return folio_id, None, None, str(e)
+
+
+def current_rss_mb():
+    """Resident set size of this process in MiB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def pool_worker(conn, func):
+    """
+    Worker loop of WorkerPool: run tasks received on `conn` until told to stop,
+    answering each with ("result", result, RSS in MiB) after any ("log", record).
+    """
+    configure_worker_logging(conn)
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        conn.send(("result", func(task), current_rss_mb()))
+
+
+class WorkerPool:
+    """
+    Process pool that keeps long runs memory-bounded. Each worker handles one file
+    at a time and is replaced after `max_tasks` files or once its RSS exceeds
+    `max_rss_mb`. A file that runs longer than `timeout` seconds, or whose worker
+    dies (e.g. killed for running out of memory), is reported as failed and its
+    worker replaced, instead of taking down the whole chunk. 0 disables a limit.
+    `context` is the multiprocessing context workers are started with (default: the
+    platform's start method).
+    """
+
+    def __init__(self, processes, max_tasks=0, max_rss_mb=0, timeout=0, context=None):
+        self.processes = max(1, processes)
+        self.max_tasks = max_tasks
+        self.max_rss_mb = max_rss_mb
+        self.timeout = timeout
+        self.context = context or multiprocessing
+        self.workers = []
+
+    def start_worker(self, func):
+        parent_conn, child_conn = self.context.Pipe()
+        process = self.context.Process(target=pool_worker, args=(child_conn, func),
+                                       daemon=True)
+        process.start()
+        child_conn.close()
+        worker = {"process": process, "conn": parent_conn, "task": None, "started": 0.0, "done": 0}
+        self.workers.append(worker)
+        return worker
+
+    def stop_worker(self, worker, kill=False):
+        if kill:
+            worker["process"].kill()
+        else:
+            try:
+                worker["conn"].send(None)
+            except OSError:
+                pass
+        worker["process"].join(5)
+        if worker["process"].is_alive():
+            worker["process"].kill()
+            worker["process"].join()
+        worker["conn"].close()
+        self.workers.remove(worker)
+
+    def check(self, worker):
+        """
+        Return (finished, outcome, replace) for a busy worker: outcome is the
+        (result, error) of its task once finished, replace is None, "recycle" or "kill".
+        """
+        while worker["conn"].poll():
+            try:
+                message = worker["conn"].recv()
+            except (EOFError, OSError, pickle.UnpicklingError):
+                return True, (None, f"worker exited with code {worker['process'].exitcode}"), "kill"
+            if message[0] == "log":
+                # Hand the worker's record to this process's logging
+                logging.getLogger(message[1].name).handle(message[1])
+                continue
+            _, result, rss_mb = message
+            worker["done"] += 1
+            if self.max_tasks and worker["done"] >= self.max_tasks:
+                return True, (result, None), "recycle"
+            if self.max_rss_mb and rss_mb > self.max_rss_mb:
+                logger.info(f"Recycling worker {worker['process'].pid} at {rss_mb:.0f} MiB RSS")
+                return True, (result, None), "recycle"
+            return True, (result, None), None
+        if not worker["process"].is_alive():
+            return True, (None, f"worker exited with code {worker['process'].exitcode}"), "kill"
+        if self.timeout and time.monotonic() - worker["started"] > self.timeout:
+            return True, (None, f"timed out after {self.timeout}s"), "kill"
+        return False, None, None
+
+    def imap_unordered(self, func, tasks):
+        """Yield (task, result, error) for every task; result is None when error is set."""
+        tasks = iter(tasks)
+
+        def assign(worker):
+            worker["task"] = next(tasks, None)
+            if worker["task"] is None:
+                self.stop_worker(worker)
+                return False
+            worker["started"] = time.monotonic()
+            worker["conn"].send(worker["task"])
+            return True
+
+        try:
+            busy = [worker for worker in [self.start_worker(func) for _ in range(self.processes)] if assign(worker)]
+            while busy:
+                timeout = None
+                if self.timeout:
+                    oldest = min(worker["started"] for worker in busy)
+                    timeout = max(0.0, oldest + self.timeout - time.monotonic())
+                wait([w["conn"] for w in busy] + [w["process"].sentinel for w in busy], timeout)
+
+                for worker in list(busy):
+                    finished, outcome, replace = self.check(worker)
+                    if not finished:
+                        continue
+                    yield (worker["task"],) + outcome
+                    busy.remove(worker)
+                    if replace:
+                        self.stop_worker(worker, kill=replace == "kill")
+                        worker = self.start_worker(func)
+                    if assign(worker):
+                        busy.append(worker)
+        finally:
+            for worker in list(self.workers):
+                self.stop_worker(worker, kill=True)
 
 
 def chunk_files(file_list, num_chunks):
@@ -775,37 +1572,81 @@ def chunk_files(file_list, num_chunks):
         yield file_list[i:i + chunk_size]
 
 
-def process_chunk(chunk_files, csv_path, output_folder, failed_folder, chunk_id):
-    """Process a chunk of files."""
+def process_chunk(chunk_files, lookup_path, sink, failed_folder, chunk_id, output_options, manifest=None,
+                  profile=None, pool_options=None, locations=None):
+    """Process a chunk of files; `locations` holds the tar member locations found by expand_inputs."""
     results = []
     
-    tasks = [(filepath, csv_path, chunk_id) for filepath in chunk_files]
+    locations = locations or {}
+    tasks = [(filepath, lookup_path, chunk_id, output_options, profile is not None, locations.get(filepath))
+             for filepath in chunk_files]
+    pool = WorkerPool(**(pool_options or {"processes": max(1, os.cpu_count() - 1)}))
     
-    with ProcessPoolExecutor(max_workers=max(1, os.cpu_count()-1)) as executor:
-        for folio_id, data, failed_path in executor.map(process_html_file, tasks):
-            if failed_path is None:
-                output_path = os.path.join(output_folder, f"{folio_id}.json")
-                with open(output_path, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=2)
-                results.append(folio_id)
-            else:
-                # Move failed file
-                shutil.copy(failed_path, os.path.join(failed_folder, os.path.basename(failed_path)))
-                logger.warning(f"Failed to process: {folio_id}")
+    for task, outcome, error in pool.imap_unordered(process_html_file, tasks):
+        filepath = task[0]
+        if error is not None:
+            # The worker timed out or died on this page
+            logger.error(f"Error processing file {filepath}: {error}")
+            outcome = (source_name(filepath), {"error": error}, None, filepath, None)
+
+        folio_id, payload, flat_row, failed_path, stats = outcome
+        if failed_path is None:
+            if profile is not None:
+                profile.add(folio_id, stats)
+            # Workers already serialized the result; just write the bytes
+            sink.write(folio_id, payload, flat_row)
+            if manifest is not None:
+                manifest.record(filepath)
+            results.append(folio_id)
+        else:
+            # Move failed file
+            quarantine(failed_path, failed_folder)
+            logger.warning(f"Failed to process: {folio_id}")
     
+    if manifest is not None:
+        # Only mark pages as done once their records are on disk
+        sink.flush()
+        manifest.commit()
     return results
 
 
 def main():
     parser = argparse.ArgumentParser(description='Process HTML files to extract data.')
-    parser.add_argument('--input', default=DEFAULT_INPUT_FOLDER, help='Input folder containing HTML files')
+    parser.add_argument('--input', nargs='+', default=[DEFAULT_INPUT_FOLDER],
+                        help='Input folders, page files (.html, .html.gz, .html.zst), .tar archives of pages, '
+                             'or glob patterns of these')
     parser.add_argument('--output', default=DEFAULT_OUTPUT_FOLDER, help='Output folder for JSON files')
+    parser.add_argument('--sink', choices=['files', 'jsonl'], default='files',
+                        help='Write one JSON file per folio, or rolling JSONL shards with an index.csv')
+    parser.add_argument('--shard-size', type=int, default=10000, help='Records per JSONL shard')
+    parser.add_argument('--shard-compression', choices=['gzip', 'none'], default='gzip',
+                        help='Compression of JSONL shards')
+    parser.add_argument('--parquet', action='store_true',
+                        help='With --sink jsonl, also write a Parquet file of the flat fields of each shard')
     parser.add_argument('--csv', default=DEFAULT_CSV_PATH, help='Path to CSV file with property data')
+    parser.add_argument('--lookup-db', default=None,
+                        help='Compiled folio lookup file (default: next to the CSV, rebuilt when the CSV changes)')
+    parser.add_argument('--compact', action='store_true',
+                        help='Write JSON without indentation (smaller and faster to encode)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only process files whose content or the extractor changed since the last run '
+                             f'(tracked in {MANIFEST_FILE} in the output folder)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Time each extractor (with allocation peaks) and print a ranked breakdown at the end')
+    parser.add_argument('--profile-top', type=int, default=10, help='Number of slowest files listed by --profile')
     parser.add_argument('--chunk-size', type=int, default=1000, help='Number of files to process in each chunk')
     parser.add_argument('--processes', type=int, default=0, 
                         help='Number of processes to use (0 for auto-detection)')
+    parser.add_argument('--max-tasks-per-child', type=int, default=500,
+                        help='Replace a worker after this many files (0 for never)')
+    parser.add_argument('--max-worker-rss-mb', type=int, default=0,
+                        help='Replace a worker once its resident memory exceeds this many MiB (0 for no limit)')
+    parser.add_argument('--file-timeout', type=int, default=300,
+                        help=f'Seconds a single file may take before it is moved to {FAILED_FOLDER} (0 for no limit)')
     
     args = parser.parse_args()
+    if args.parquet and (args.sink != 'jsonl' or pa is None):
+        parser.error("--parquet needs --sink jsonl and pyarrow (pip install pyarrow)")
     
     # Check for optimal dependencies
     try:
@@ -813,45 +1654,106 @@ def main():
         logger.info("Using lxml parser for optimal performance")
     except ImportError:
         logger.warning("lxml parser not found. For better performance, install it with: pip install lxml")
+    if orjson is None:
+        logger.info("orjson not found, using the standard json encoder. For faster output, install it with: pip install orjson")
     
     # Create output and failed directories
     os.makedirs(args.output, exist_ok=True)
     os.makedirs(FAILED_FOLDER, exist_ok=True)
     
+    # Compile the CSV once; every worker shares the resulting file read-only
+    lookup_path = args.lookup_db or f"{os.path.splitext(args.csv)[0]}.folios.sqlite"
+    try:
+        compile_folio_lookup(args.csv, lookup_path)
+        logger.info(f"Using folio lookup {lookup_path}")
+    except Exception as e:
+        logger.error(f"Error compiling CSV file {args.csv} into {lookup_path}: {e}")
+        lookup_path = None
+
     # Set processes to use
     num_processes = args.processes if args.processes > 0 else max(1, os.cpu_count() - 1)
     
     # Get list of HTML files
-    html_files = [os.path.join(args.input, f) for f in os.listdir(args.input) if f.endswith(".html")]
+    member_locations = {}
+    try:
+        html_files = expand_inputs(args.input, member_locations)
+    except (OSError, ValueError, tarfile.TarError) as e:
+        parser.error(str(e))
+    if zstandard is None and any(f.endswith(".zst") for f in html_files):
+        parser.error("reading .zst pages needs zstandard (pip install zstandard)")
+    logger.info(f"Found {len(html_files)} HTML files")
+
+    output_options = {
+        "sink": args.sink,
+        "compact": args.compact,
+        "compression": args.shard_compression,
+        "parquet": args.parquet,
+    }
+    manifest = None
+    if args.incremental:
+        # Its own connection, not get_folio_lookup's cached one, which forked workers would inherit
+        manifest = Stage2Manifest(os.path.join(args.output, MANIFEST_FILE), extractor_fingerprint(output_options),
+                                  FolioLookup(lookup_path) if lookup_path else None)
+        html_files = manifest.changed(html_files)
+        logger.info(f"Incremental run: {len(html_files)} new or changed files to process")
+
     total_files = len(html_files)
-    logger.info(f"Found {total_files} HTML files to process")
+    if total_files == 0:
+        logger.info("Nothing to process.")
+        if manifest is not None:
+            manifest.close()
+        return
     
     # Determine optimal chunk size based on number of files
     num_chunks = max(1, total_files // args.chunk_size)
     logger.info(f"Processing files in {num_chunks} chunks with {num_processes} parallel processes")
     
+    if args.sink == 'jsonl':
+        sink = ShardedJsonlSink(args.output, args.shard_size, args.shard_compression, args.parquet)
+    else:
+        sink = FolderSink(args.output)
+
+    profile = Stage2Profile(args.profile_top) if args.profile else None
+    pool_options = {
+        "processes": num_processes,
+        "max_tasks": args.max_tasks_per_child,
+        "max_rss_mb": args.max_worker_rss_mb,
+        "timeout": args.file_timeout,
+    }
+
     # Process files in chunks
     processed_count = 0
     
-    for i, chunk in enumerate(chunk_files(html_files, num_chunks)):
-        logger.info(f"Processing chunk {i+1}/{num_chunks} ({len(chunk)} files)")
-        results = process_chunk(chunk, args.csv, args.output, FAILED_FOLDER, i)
-        processed_count += len(results)
-        
-        # Report progress
-        logger.info(f"Chunk {i+1} complete: {len(results)} files processed successfully")
-        logger.info(f"Progress: {processed_count}/{total_files} ({processed_count/total_files*100:.1f}%)")
+    try:
+        for i, chunk in enumerate(chunk_files(html_files, num_chunks)):
+            logger.info(f"Processing chunk {i+1}/{num_chunks} ({len(chunk)} files)")
+            results = process_chunk(chunk, lookup_path, sink, FAILED_FOLDER, i, output_options, manifest, profile,
+                                    pool_options, member_locations)
+            processed_count += len(results)
+            
+            # Report progress
+            logger.info(f"Chunk {i+1} complete: {len(results)} files processed successfully")
+            logger.info(f"Progress: {processed_count}/{total_files} ({processed_count/total_files*100:.1f}%)")
+    finally:
+        sink.close()
+        if manifest is not None:
+            manifest.close()
     
     logger.info(f"Processing complete. {processed_count} files processed successfully.")
+    if profile is not None:
+        profile.report()
     failed_count = total_files - processed_count
     if failed_count > 0:
         logger.warning(f"{failed_count} files failed processing and were moved to {FAILED_FOLDER}")
 
 
 if __name__ == "__main__":
+    log_listener = start_logging()
     try:
         main()
     except KeyboardInterrupt:
         logger.info("Processing interrupted by user")
     except Exception as e:
-        logger.error(f"Unexpected error: {e}", exc_info=True)
\ No newline at end of file
+        logger.error(f"Unexpected error: {e}", exc_info=True)
+    finally:
+        stop_logging(log_listener)
\ No newline at end of file
@@ -7,13 +7,28 @@ import traceback
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import multiprocessing
 from tqdm import tqdm
 import time
 import argparse
+from collections import Counter
+from functools import lru_cache
 import boto3
-from botocore.exceptions import ClientError
-import io
+import backoff
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+import gzip
+import hashlib
+import pickle
+import queue
+import sqlite3
+import threading
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 
 # Configuration parameters
@@ -25,16 +40,108 @@ OUTPUT_FOLDER = "mapped_outputs_total_lee_county_parsed/"
 # INPUT_FOLDER = "test_download_lee"
 # OUTPUT_FOLDER = "mapped_outputs_test_download_lee/"
 STRAP_CSV_PATH = "../data/filtered_strap_data.csv"
+OWNERS_CSV_PATH = "../data/full_names_combined.csv"
+# Owner index and STRAP rows compiled from the two CSVs, reloaded in place of them
+REFERENCE_CACHE_PATH = "../data/lexicon_reference.pickle"
+# Bump whenever the cached tables change shape (group_owners, strap_rows), so old caches are rebuilt
+CACHE_VERSION = 1
+# <folio>.json photo lists, and the index of cleaned URLs compiled from them
+PHOTO_FOLDER = "all_photos"
+PHOTO_INDEX_PATH = "all_photos.sqlite"
 S3_BUCKET = "lee-county-oracle-data"
 S3_PREFIX = "lexicon-full"
+# Content hashes of uploaded objects, used to skip re-uploading unchanged output
+UPLOAD_MANIFEST_PATH = "upload_manifest.sqlite"
+# Hashes written to it per transaction, keeping its write lock short for the other workers
+UPLOAD_MANIFEST_WRITE_SIZE = 100
+# ULID timestamp of deterministic IDs (2020-01-01T00:00:00Z), which keeps them prefixed with 01
+DETERMINISTIC_ID_TIMESTAMP_MS = 1577836800000
+# Distinct street names and cities remembered by the normalization caches (per process)
+NORMALIZATION_CACHE_SIZE = 65536
+# Records read and normalized together before they are transformed one by one
+BATCH_SIZE = 500
+
+def group_owners(owners_df):
+    """Group owner rows by folio_id once, so each parcel's owners are a dict lookup."""
+    owners_by_folio = {}
+    for row in owners_df.to_dict("records"):
+        owners_by_folio.setdefault(row["folio_id"], []).append(row)
+    return owners_by_folio
+
+class ReferenceData:
+    """
+    Owner rows by folio and STRAP rows by folio, read from the CSVs the first time
+    they are needed. With a cache_path the compiled tables are pickled there and
+    loaded from it on later runs, until either CSV changes. Photo URLs are looked
+    up in the index at photo_index_path, which main() brings up to date with the
+    photo folder before conversion starts (see compile_photo_index); with no
+    photo_index_path, records get no photos.
+    """
 
-# Load data
-owners_df = pd.read_csv("../data/full_names_combined.csv", dtype={"folio_id": str})
-owners_df = owners_df.where(pd.notna(owners_df), "")
-
-strap_df = pd.read_csv(STRAP_CSV_PATH, dtype=str).fillna("")
-strap_df.set_index("FolioID", inplace=True)
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+    def __init__(self, owners_csv=OWNERS_CSV_PATH, strap_csv=STRAP_CSV_PATH, cache_path=REFERENCE_CACHE_PATH,
+                 photo_index_path=PHOTO_INDEX_PATH):
+        self.config = {"owners_csv": owners_csv, "strap_csv": strap_csv, "cache_path": cache_path,
+                       "photo_index_path": photo_index_path}
+        self.owners_csv = owners_csv
+        self.strap_csv = strap_csv
+        self.cache_path = cache_path
+        self.photo_index_path = photo_index_path
+        self.tables = None
+        self.photo_index = None
+        self.photo_index_pid = None
+        self.photo_lock = threading.Lock()
+
+    def photo_urls(self, folio_id):
+        """Cleaned photo URLs of `folio_id`, [] when it has none."""
+        # One connection per process; a forked worker must not reuse its parent's
+        if self.photo_index_pid != os.getpid():
+            with self.photo_lock:
+                if self.photo_index_pid != os.getpid():
+                    self.photo_index = None
+                    if self.photo_index_path and os.path.exists(self.photo_index_path):
+                        self.photo_index = PhotoIndex(self.photo_index_path)
+                    self.photo_index_pid = os.getpid()
+        return self.photo_index.get(folio_id) if self.photo_index is not None else []
+
+    @property
+    def owners_by_folio(self):
+        return self.load()["owners_by_folio"]
+
+    @property
+    def strap_rows(self):
+        return self.load()["strap_rows"]
+
+    def source_stamp(self):
+        return [CACHE_VERSION] + [(path, os.stat(path).st_size, os.stat(path).st_mtime_ns)
+                                  for path in (self.owners_csv, self.strap_csv)]
+
+    def load(self):
+        if self.tables is not None:
+            return self.tables
+        stamp = self.source_stamp()
+        if self.cache_path and os.path.exists(self.cache_path):
+            with open(self.cache_path, "rb") as f:
+                cached = pickle.load(f)
+            if cached.get("stamp") == stamp:
+                self.tables = cached
+                return self.tables
+
+        owners_df = pd.read_csv(self.owners_csv, dtype={"folio_id": str})
+        owners_df = owners_df.where(pd.notna(owners_df), "")
+        strap_rows = {}
+        for row in pd.read_csv(self.strap_csv, dtype=str).fillna("").to_dict("records"):
+            strap_rows.setdefault(row["FolioID"], row)
+        self.tables = {"stamp": stamp, "owners_by_folio": group_owners(owners_df), "strap_rows": strap_rows}
+
+        if self.cache_path:
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(self.tables, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.cache_path)
+        return self.tables
+
+# Replaced by main() from the command line
+reference = ReferenceData()
 
 # Property type mapping
 MAP_PROPERTY_TYPE = {
@@ -577,20 +684,21 @@ USPS_SUFFIXES = {
     "WLS": "WLS",
 }
 
+@lru_cache(maxsize=NORMALIZATION_CACHE_SIZE)
 def normalize_city_name(city_name: str) -> str:
     return ' '.join(word.capitalize() for word in city_name.strip().split())
 
-def normalize_directional(word):
-    return DIRECTIONAL_MAP.get(word.upper())
-
-def normalize_suffix(word):
-    return USPS_SUFFIXES.get(word.upper())
-
 def title_case_street_name(name):
     """Title case and keep words like 'Via Messina' correctly capitalized"""
     return " ".join(word.capitalize() for word in name.split())
 
-def process_street_name(street_name: str):
+@lru_cache(maxsize=NORMALIZATION_CACHE_SIZE)
+def parse_street_name(street_name: str):
+    """
+    (pre-directional, name, suffix, post-directional) of a street name. Cached:
+    a county has a few thousand distinct street names across all its parcels.
+    """
+    # Tokens are upper-cased once, so each is a single lookup in the maps
     tokens = street_name.strip().upper().split()
 
     pre_dir = None
@@ -598,16 +706,18 @@ def process_street_name(street_name: str):
     suffix = None
 
     if tokens and tokens[0] in DIRECTIONAL_MAP:
-        pre_dir = normalize_directional(tokens.pop(0))
+        pre_dir = DIRECTIONAL_MAP[tokens.pop(0)]
 
     if tokens and tokens[-1] in DIRECTIONAL_MAP:
-        post_dir = normalize_directional(tokens.pop())
+        post_dir = DIRECTIONAL_MAP[tokens.pop()]
 
     if tokens and tokens[-1] in USPS_SUFFIXES:
-        suffix = normalize_suffix(tokens.pop())
+        suffix = USPS_SUFFIXES[tokens.pop()]
 
-    base_name = title_case_street_name(" ".join(tokens))
+    return pre_dir, title_case_street_name(" ".join(tokens)), suffix, post_dir
 
+def process_street_name(street_name: str):
+    pre_dir, base_name, suffix, post_dir = parse_street_name(street_name)
     return {
         "street_pre_directional_text": pre_dir,
         "street_name": base_name,
@@ -615,11 +725,44 @@ def process_street_name(street_name: str):
         "street_post_directional_text": post_dir,
     }
 
-def generate_id(_: str = "") -> str:
-    """Generate a ULID-based ID prefixed with 01."""
-    return str(ulid.new())
+def normalization_stats():
+    """Hits and misses of this process's street name and city caches."""
+    stats = Counter()
+    for name, cached in (("street names", parse_street_name), ("cities", normalize_city_name)):
+        info = cached.cache_info()
+        stats[f"{name} hits"] = info.hits
+        stats[f"{name} misses"] = info.misses
+    return stats
+
+# Set by main (--deterministic_ids); transform scopes the IDs to the folio it converts
+deterministic_ids = False
+_id_scope = threading.local()
+
+def start_id_scope(folio_id):
+    _id_scope.folio_id = str(folio_id)
+    _id_scope.seen = Counter()
+
+def generate_id(key: str = "") -> str:
+    """
+    Generate a ULID-based ID prefixed with 01. With deterministic IDs, the random
+    part is a hash of the current folio and `key` (the node type and its natural
+    key), so converting an unchanged record again yields the same IDs.
+    """
+    if not deterministic_ids:
+        return str(ulid.new())
+    name = f"{getattr(_id_scope, 'folio_id', '')}|{key}"
+    # Nodes sharing a natural key (two identical sales rows, say) are told apart by occurrence
+    seen = getattr(_id_scope, "seen", None)
+    if seen is None:
+        seen = _id_scope.seen = Counter()
+    occurrence = seen[name]
+    seen[name] += 1
+    digest = hashlib.sha256(f"{name}|{occurrence}".encode("utf-8")).digest()
+    return str(ulid.from_bytes(DETERMINISTIC_ID_TIMESTAMP_MS.to_bytes(6, "big") + digest[:10]))
 
 def safe_int(value, default=""):
+    if type(value) is int:
+        return value
     try:
         return int(str(value).replace(",", "").strip())
     except (ValueError, TypeError):
@@ -629,6 +772,8 @@ def normalize_parcel_identifier(raw_strap: str) -> str:
     return raw_strap.replace("-", "").replace(".", "")
 
 def safe_float(value, default=""):
+    if type(value) in (int, float):
+        return float(value)
     try:
         return float(str(value).replace(",", "").strip())
     except (ValueError, TypeError):
@@ -642,9 +787,15 @@ def map_addresses(tax_entries):
     for entry in tax_entries:
         addr = normalize_address(entry.get("Mailing Address", ""))
         if addr:
-            address_id_map[addr] = generate_id()
+            address_id_map[addr] = generate_id(f"address:mailing:{addr}")
     return address_id_map
 
+def parse_date(value):
+    """Parse a MM/DD/YYYY date, unless normalize_batch already turned it into a datetime."""
+    if isinstance(value, datetime):
+        return value
+    return datetime.strptime(value, "%m/%d/%Y")
+
 def get_latest_sale_date(sales_data):
     valid_dates = []
 
@@ -652,7 +803,7 @@ def get_latest_sale_date(sales_data):
         date_str = sale.get("Date", "")
         try:
             # Parse the date from MM/DD/YYYY format
-            date_obj = datetime.strptime(date_str, "%m/%d/%Y")
+            date_obj = parse_date(date_str)
             valid_dates.append(date_obj)
         except ValueError:
             continue  # Skip rows with bad date format
@@ -682,14 +833,17 @@ def map_sales_histories(data, property_id, people, ownerships_id):
         formatted_date = None
         if date_str:
             try:
-                formatted_date = datetime.strptime(date_str, "%m/%d/%Y").strftime("%Y-%m-%d")
+                formatted_date = parse_date(date_str).strftime("%Y-%m-%d")
             except ValueError:
                 formatted_date = date_str
+        # Natural key of the sale's nodes, built from the parsed values so it is the same
+        # whether or not normalize_batch converted the raw strings first
+        sale_key = f"{formatted_date}|{safe_float(price_str)}|{file_num}"
 
         # Document
         doc_id = None
         if file_links and file_links[0]!= "https://www.leepa.org":
-            doc_id = generate_id()
+            doc_id = generate_id(f"document:sale:{sale_key}")
             sales_documents.append({
                 "@id": doc_id,
                 "@type": "document",
@@ -698,7 +852,7 @@ def map_sales_histories(data, property_id, people, ownerships_id):
                 "document_date": formatted_date,
                 "document_url": file_links[0]
             })
-        sales_id = generate_id()
+        sales_id = generate_id(f"sales_transaction:{sale_key}")
         # Sale history
         sale = {
             "@id": sales_id,
@@ -713,13 +867,13 @@ def map_sales_histories(data, property_id, people, ownerships_id):
 
 
         finance_relation = {
-            "@id": generate_id(),
+            "@id": generate_id(f"finance_relation:{sale_key}"),
             "@type": "finance_relation",
             "has_property": property_id,
             "has_sales_transactions": sales_id,
         }
         if safe_float(price_str) > 0:
-            valuations_id = generate_id()
+            valuations_id = generate_id(f"property_valuation:{sale_key}")
             valuations.append({
                 "@id": valuations_id,
                 "@type": "property_valuation",
@@ -745,11 +899,11 @@ def extract_people_ownerships_communications(folio_id, property_id, strap_row, d
     ownerships_id = []
     sales_data = data.get("Sales / Transactions", [])
     latest_year = get_latest_sale_date(sales_data)
-    property_owners = owners_df[owners_df["folio_id"] == str(folio_id)]
     # iterate over the rows
-    for index, row in property_owners.iterrows():
+    for row in reference.owners_by_folio.get(str(folio_id), []):
         name_type = row["name_type"]
-        address_id = generate_id()
+        owner_key = row["raw_name"].strip()
+        address_id = generate_id(f"address:owner:{owner_key}")
         address_obj = {
             "@id": address_id,
             "@type": "address",
@@ -762,7 +916,7 @@ def extract_people_ownerships_communications(folio_id, property_id, strap_row, d
         }
 
         addresses.append(address_obj)
-        communication_id = generate_id()
+        communication_id = generate_id(f"communication:{owner_key}")
         communications.append({
             "@id": communication_id,
             "@type": "communication",
@@ -770,7 +924,7 @@ def extract_people_ownerships_communications(folio_id, property_id, strap_row, d
         })
         if name_type == "person":
             # Create a person node
-            person_id = generate_id()
+            person_id = generate_id(f"person:{owner_key}")
             person_node = {
                 "@id": person_id,
                 "@type": "person",
@@ -784,7 +938,7 @@ def extract_people_ownerships_communications(folio_id, property_id, strap_row, d
             }
             people.append(person_node)
 
-            ownership_id = generate_id()
+            ownership_id = generate_id(f"ownership:{owner_key}")
             # Create an ownership node
             ownership_node = {
                 "@id": ownership_id,
@@ -797,7 +951,7 @@ def extract_people_ownerships_communications(folio_id, property_id, strap_row, d
             ownerships_id.append(ownership_id)
         else:
             # Create a company node
-            company_id = generate_id()
+            company_id = generate_id(f"company:{owner_key}")
             company_node = {
                 "@id": company_id,
                 "@type": "company",
@@ -806,7 +960,7 @@ def extract_people_ownerships_communications(folio_id, property_id, strap_row, d
             }
             companies.append(company_node)
 
-            ownership_id = generate_id()
+            ownership_id = generate_id(f"ownership:{owner_key}")
             # Create an ownership node
             ownership_node = {
                 "@id": ownership_id,
@@ -834,6 +988,85 @@ def clean_image_url(url):
 
     return cleaned_url
 
+def read_photo_list(path, folio_id):
+    """Cleaned image URLs of one <folio>.json photo list."""
+    urls = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            photo_entries = json.load(f)
+        for photo_entry in photo_entries:
+            url = photo_entry.get("image_url")
+            if url:
+                urls.append(clean_image_url(url))
+    except Exception as e:
+        print(f"Error reading image JSON for folio {folio_id}: {e}")
+    return urls
+
+def compile_photo_index(photo_folder, db_path, rebuild=False, refresh=False):
+    """
+    Bring the SQLite index of cleaned image URLs by folio ID up to date with the
+    <folio>.json photo lists of `photo_folder`. By default the index is used as-is
+    while the folder's mtime is unchanged; when it changed, only the names are
+    listed, so lists added since the last run are read and removed ones dropped.
+    refresh=True also stats every list and re-reads the ones rewritten in place
+    (e.g. by the nightly photo refresh); rebuild=True reads them all again.
+    Raises OSError, without creating the index, when the folder cannot be read.
+    """
+    if not os.path.isdir(photo_folder):
+        raise FileNotFoundError(f"No such directory: {photo_folder}")
+    if not os.access(photo_folder, os.R_OK | os.X_OK):
+        raise PermissionError(f"Cannot read directory: {photo_folder}")
+    folder_mtime_ns = os.stat(photo_folder).st_mtime_ns
+
+    conn = sqlite3.connect(db_path, timeout=60)
+    try:
+        conn.execute("CREATE TABLE IF NOT EXISTS photo_lists "
+                     "(folio_id TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, urls TEXT) WITHOUT ROWID")
+        conn.execute("CREATE TABLE IF NOT EXISTS photo_folder (key TEXT PRIMARY KEY, value INTEGER)")
+        stored = conn.execute("SELECT value FROM photo_folder WHERE key = 'mtime_ns'").fetchone()
+        if not (rebuild or refresh) and stored and stored[0] == folder_mtime_ns:
+            return db_path
+
+        known = {} if rebuild else {
+            row[0]: row[1:] for row in conn.execute("SELECT folio_id, size, mtime_ns FROM photo_lists")}
+        changed = []
+        listed = set()
+        for entry in os.scandir(photo_folder):
+            if not entry.name.endswith(".json"):
+                continue
+            folio_id = entry.name[:-len(".json")]
+            listed.add(folio_id)
+            if folio_id in known and not refresh:
+                continue
+            stat = entry.stat()
+            if known.get(folio_id) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            urls = read_photo_list(entry.path, folio_id)
+            changed.append((folio_id, stat.st_size, stat.st_mtime_ns, json.dumps(urls)))
+        removed = [(folio_id,) for folio_id in known if folio_id not in listed]
+        with conn:
+            if rebuild:
+                conn.execute("DELETE FROM photo_lists")
+            conn.executemany("INSERT OR REPLACE INTO photo_lists VALUES (?, ?, ?, ?)", changed)
+            conn.executemany("DELETE FROM photo_lists WHERE folio_id = ?", removed)
+            conn.execute("INSERT OR REPLACE INTO photo_folder VALUES ('mtime_ns', ?)", (folder_mtime_ns,))
+    finally:
+        conn.close()
+    return db_path
+
+class PhotoIndex:
+    """Read-only, memory-mapped view of a compiled photo index, shared by the threads of a process."""
+
+    def __init__(self, db_path):
+        # Not immutable: a later run may update the index in place
+        uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self.conn.execute("PRAGMA mmap_size = 268435456")
+
+    def get(self, folio_id):
+        row = self.conn.execute("SELECT urls FROM photo_lists WHERE folio_id = ?", (str(folio_id),)).fetchone()
+        return json.loads(row[0]) if row else []
+
 def map_property_photos(prop_desc, buildings_info, folio_id):
     """Creates document entries for known photo types and returns their IDs."""
     photos = []
@@ -859,26 +1092,16 @@ def map_property_photos(prop_desc, buildings_info, folio_id):
     #         })
     #
     #         photo_ids.append(pid)
-    # 2. Handle additional photos from local 33936/ folder using folio_id.json
-    folder_path = "all_photos"
-    photo_json_path = os.path.join(folder_path, f"{folio_id}.json")
-    if os.path.isfile(photo_json_path):
-        try:
-            with open(photo_json_path, "r", encoding="utf-8") as f:
-                photo_entries = json.load(f)
-            for entry in photo_entries:
-                url = entry.get("image_url")
-                if url:
-                    pid = generate_id()
-                    photos.append({
-                        "@id": pid,
-                        "@type": "document",
-                        "document_identifier": "StructureImage",
-                        "property_image_url": clean_image_url(url)
-                    })
-                    photo_ids.append(pid)
-        except Exception as e:
-            print(f"Error reading image JSON for folio {folio_id}: {e}")
+    # 2. Handle additional photos listed in all_photos/<folio_id>.json, via the compiled photo index
+    for url in reference.photo_urls(folio_id):
+        pid = generate_id(f"document:photo:{url}")
+        photos.append({
+            "@id": pid,
+            "@type": "document",
+            "document_identifier": "StructureImage",
+            "property_image_url": url
+        })
+        photo_ids.append(pid)
 
     # for building in buildings_info:
     #     # Also check for building footprint in building info
@@ -907,10 +1130,13 @@ def extract_latest_trim_values(data):
 
     for entry in trim_list:
         tax_year_str = entry.get("Tax Year", "")
-        match = re.search(r"\b(19|20)\d{2}\b", tax_year_str)
-        if not match:
-            continue
-        year = int(match.group(0))
+        if type(tax_year_str) is int:
+            year = tax_year_str
+        else:
+            match = re.search(r"\b(19|20)\d{2}\b", tax_year_str)
+            if not match:
+                continue
+            year = int(match.group(0))
         if (latest_year is None) or (year > latest_year):
             latest_year = year
             latest_entry = entry
@@ -924,68 +1150,113 @@ def extract_latest_trim_values(data):
         exemptions = safe_float(latest_entry.get("Exemptions", "0"))
     return taxable, market_assessed, exemptions
 
+# Numeric and date fields that normalize_batch converts for a whole batch at once:
+# (section, key, kind). Each kind parses exactly what the per-record helpers accept.
+NORMALIZED_FIELDS = [
+    ("Sales / Transactions", "Sale Price", "number"),
+    ("Sales / Transactions", "Date", "date"),
+    ("Property Values / Exemptions / TRIM Notices", "Tax Year", "year"),
+    ("Property Values / Exemptions / TRIM Notices", "Market Assessed", "number"),
+    ("Property Values / Exemptions / TRIM Notices", "Taxable", "number"),
+    ("Property Values / Exemptions / TRIM Notices", "Exemptions", "number"),
+    ("Property Description", "Gross Living Area", "integer"),
+    ("Property Description", "Gross Building Area", "integer"),
+    ("Property Description", "1st Year Building on Tax Roll", "integer"),
+    ("Property Description", "Latitude", "float"),
+    ("Property Description", "Longitude>", "float"),
+]
+
+def coerce_values(values, kind):
+    """
+    Vectorized parse of a Series of strings; unparseable values come back as NaN/NaT.
+    "number" and "integer" follow safe_float and safe_int, "float" follows float(),
+    "year" the Tax Year regex and "date" MM/DD/YYYY.
+    """
+    if kind == "date":
+        return pd.to_datetime(values, format="%m/%d/%Y", errors="coerce")
+    if kind == "year":
+        return pd.to_numeric(values.str.extract(r"\b((?:19|20)\d{2})\b", expand=False))
+    if kind == "float":
+        return pd.to_numeric(values, errors="coerce")
+    cleaned = values.str.replace(",", "", regex=False).str.strip()
+    if kind == "integer":
+        cleaned = cleaned.where(cleaned.str.fullmatch(r"[+-]?\d+", na=False))
+    return pd.to_numeric(cleaned, errors="coerce")
+
+def normalize_batch(records):
+    """
+    Convert the NORMALIZED_FIELDS of a batch of stage-2 records in place, one
+    vectorized pass per field, to int, float or datetime values. Values that
+    fail to parse are left as they were, for the per-record helpers to handle
+    as before. Returns a Counter of such failures per "section.key".
+    """
+    failures = Counter()
+    for section, key, kind in NORMALIZED_FIELDS:
+        holders = []
+        for data in records:
+            rows = data.get(section) or []
+            for row in [rows] if isinstance(rows, dict) else rows:
+                if isinstance(row, dict) and isinstance(row.get(key), str) and row[key].strip():
+                    holders.append(row)
+        if not holders:
+            continue
+
+        parsed = coerce_values(pd.Series([row[key] for row in holders], dtype=object), kind)
+        valid = parsed.notna().to_numpy()
+        if kind in ("year", "integer"):
+            values = parsed.fillna(0).astype("int64").tolist()
+        else:
+            values = parsed.tolist()
+        for row, value, ok in zip(holders, values, valid):
+            if ok:
+                row[key] = value
+        failed = len(holders) - int(valid.sum())
+        if failed:
+            failures[f"{section}.{key}"] += failed
+    return failures
+
+# Scalars that remove_empty_values drops, besides None
+EMPTY_VALUES = frozenset(["", "N/A", "None", "null"])
+
 def remove_empty_values(obj):
     """
     Recursively remove:
-      - None or empty string values from dicts and lists
+      - None, empty string and "N/A"/"None"/"null" values from dicts and lists
       - empty dicts
       - empty lists
     Returns cleaned object or None if the entire structure is effectively empty.
+    Scalars are checked inline against EMPTY_VALUES, so only containers recurse.
     """
-
-    invalid_values = ["", "N/A", "None", "null", None]
-
     if isinstance(obj, dict):
-        # We'll build a new dict with only non-empty items
         new_dict = {}
         for key, value in obj.items():
-            cleaned_value = remove_empty_values(value)
-            # Skip if it became None or an empty container
-            if cleaned_value is None:
-                continue
-            if isinstance(cleaned_value, dict) and not cleaned_value:
-                # empty dict
-                continue
-            if isinstance(cleaned_value, list) and not cleaned_value:
-                # empty list
+            if isinstance(value, (dict, list)):
+                value = remove_empty_values(value)
+                # None (a dict that became empty) or an empty list
+                if not value:
+                    continue
+            elif value is None or (isinstance(value, str) and value in EMPTY_VALUES):
                 continue
-            if cleaned_value in invalid_values:
-                # empty string
-                continue
-
-            new_dict[key] = cleaned_value
-
+            new_dict[key] = value
         # If the resulting dict is empty, return None (indicates to the parent that this should be dropped)
-        if not new_dict:
-            return None
-        return new_dict
+        return new_dict or None
 
-    elif isinstance(obj, list):
-        # Build a new list with only non-empty items
+    if isinstance(obj, list):
         new_list = []
         for item in obj:
-            cleaned_item = remove_empty_values(item)
-            # Skip if None or empty container/string
-            if cleaned_item is None:
-                continue
-            if isinstance(cleaned_item, dict) and not cleaned_item:
-                continue
-            if isinstance(cleaned_item, list) and not cleaned_item:
-                continue
-            if cleaned_item in invalid_values:
+            if isinstance(item, (dict, list)):
+                item = remove_empty_values(item)
+                if not item:
+                    continue
+            elif item is None or (isinstance(item, str) and item in EMPTY_VALUES):
                 continue
-            new_list.append(cleaned_item)
+            new_list.append(item)
         return new_list
 
-    else:
-        # For scalars (strings, numbers, booleans, etc.)
-        # Remove if it's None or empty string
-        if obj is None:
-            return None
-        if obj in invalid_values:
-            return None
-        # Keep everything else (e.g., numeric 0 is kept, booleans are kept)
-        return obj
+    # For scalars, keep everything else (e.g., numeric 0 is kept, booleans are kept)
+    if obj is None or (isinstance(obj, str) and obj in EMPTY_VALUES):
+        return None
+    return obj
 
 MAP_USE_CODE = {
     "1": "SingleFamily",
@@ -1009,7 +1280,8 @@ def get_property_type(property_description):
 def transform(data):
     try:
         folio_id = data["Property Data"]["Folio ID"]
-        property_id = generate_id()
+        start_id_scope(folio_id)
+        property_id = generate_id("property")
         prop_desc = data["Property Description"]
         buildings = data.get("Property Details", {}).get("Building Info", [])
         land_tracts = data.get("Property Details", {}).get("Land Tracts", {})
@@ -1025,11 +1297,11 @@ def transform(data):
 
 
         prop_desc = data.get("Property Description", {})
-        address_id = generate_id()
+        address_id = generate_id("address:site")
 
-        if str(folio_id) not in strap_df.index:
+        strap_row = reference.strap_rows.get(str(folio_id))
+        if strap_row is None:
             return None
-        strap_row = strap_df.loc[str(folio_id)] if str(folio_id) in strap_df.index else None
 
         ownerships, companies, people, comm_addresses, communications, ownerships_id = extract_people_ownerships_communications(folio_id, property_id, strap_row, data)
         sales_histories, sales_docs, property_valuations, finance_relations, latest_year = map_sales_histories(data, property_id, people, ownerships_id)
@@ -1063,8 +1335,9 @@ def transform(data):
                 "county_name": "Lee County",
                 "country_code": "US",
                 "unit_identifier": unit_number,
-                "latitude": float(prop_desc.get("Latitude")) if prop_desc.get("Latitude") else None,
-                "longitude": float(prop_desc.get("Longitude>")) if prop_desc.get("Longitude>") else None,
+                # normalize_batch may have made these numbers already, and 0 is still a value
+                "latitude": float(prop_desc["Latitude"]) if prop_desc.get("Latitude") not in (None, "") else None,
+                "longitude": float(prop_desc["Longitude>"]) if prop_desc.get("Longitude>") not in (None, "") else None,
                 # "municipality_name": prop_desc.get("Municipality", "")
             }
         property_taxable_value_amount, property_assessed_value_amount, property_exemption_amount = extract_latest_trim_values(data)
@@ -1101,7 +1374,7 @@ def transform(data):
                 "bedroom_count": safe_int(beds),
             })
 
-        if prop_desc.get("1st Year Building on Tax Roll") and prop_desc["1st Year Building on Tax Roll"] != "N/A":
+        if prop_desc.get("1st Year Building on Tax Roll") not in (None, "", "N/A"):
             property_obj["property_structure_built_year"] = safe_int(prop_desc["1st Year Building on Tax Roll"])
 
         tax_entries = data.get("Taxing Authorities", [])
@@ -1128,122 +1401,478 @@ def transform(data):
         print(traceback.format_exc())
         return None
 
-def upload_to_s3(s3_client, json_content, filename, bucket, prefix):
-    """Upload JSON content to S3 bucket"""
-    try:
-        key = f"{prefix}/{filename}"
-        s3_client.upload_fileobj(
-            io.BytesIO(json.dumps(json_content).encode('utf-8')),
-            bucket,
-            key,
-            ExtraArgs={'ContentType': 'application/json'}
-        )
+class S3Backend:
+    """Writes objects to an S3 bucket, or an S3-compatible store such as MinIO."""
+
+    def __init__(self, s3_client, bucket, prefix):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.location = f"s3://{bucket}/{prefix}"
+
+    def describe(self):
+        return f"S3 bucket {self.bucket} with prefix {self.prefix}"
+
+    def put(self, filename, body, content_encoding=None):
+        extra = {"ContentEncoding": content_encoding} if content_encoding else {}
+        self.s3_client.put_object(Bucket=self.bucket, Key=f"{self.prefix}/{filename}", Body=body,
+                                  ContentType="application/json", **extra)
+
+    def etag(self, filename):
+        """ETag of the stored object (the MD5 of its body for single-part uploads), or None."""
+        try:
+            response = self.s3_client.head_object(Bucket=self.bucket, Key=f"{self.prefix}/{filename}")
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return response["ETag"].strip('"')
+
+class LocalBackend:
+    """Stand-in for S3 that stores each object as <folder>/<bucket>/<prefix>/<filename>."""
+
+    def __init__(self, folder, bucket, prefix):
+        self.path = os.path.join(folder, bucket, prefix)
+        self.location = self.path
+
+    def describe(self):
+        return f"local folder {self.path}"
+
+    def put(self, filename, body, content_encoding=None):
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = os.path.join(self.path, f".{filename}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, os.path.join(self.path, filename))
+
+    def etag(self, filename):
+        try:
+            with open(os.path.join(self.path, filename), "rb") as f:
+                return hashlib.md5(f.read()).hexdigest()
+        except FileNotFoundError:
+            return None
+
+class UploadManifest:
+    """
+    Content hash of every object uploaded successfully, keyed by its location, so
+    output identical to what was uploaded last time is not uploaded again. Hashes
+    are written in short transactions of up to `write_size` rows, as worker
+    processes share the file and SQLite allows one writer at a time.
+    """
+
+    def __init__(self, manifest_path, write_size=UPLOAD_MANIFEST_WRITE_SIZE):
+        # Uploader threads share the connection; worker processes each open their own
+        self.conn = sqlite3.connect(manifest_path, timeout=60, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS uploads (key TEXT PRIMARY KEY, sha256 TEXT)")
+        self.conn.commit()
+        self.lock = threading.Lock()
+        self.write_size = write_size
+        self.pending = []
+
+    def unchanged(self, key, sha256):
+        with self.lock:
+            row = self.conn.execute("SELECT sha256 FROM uploads WHERE key = ?", (key,)).fetchone()
+        return row is not None and row[0] == sha256
+
+    def record(self, key, sha256):
+        with self.lock:
+            self.pending.append((key, sha256))
+            if len(self.pending) >= self.write_size:
+                self.write_pending()
+
+    def write_pending(self):
+        # Called with the lock held. A failed write only costs a re-upload later,
+        # so the object is not reported as failed; its hash is retried next time.
+        if not self.pending:
+            return
+        try:
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO uploads VALUES (?, ?)", self.pending)
+        except sqlite3.OperationalError as e:
+            print(f"Could not update the upload manifest, {len(self.pending)} hashes kept for the next write: {e}")
+            return
+        self.pending = []
+
+    def commit(self):
+        with self.lock:
+            self.write_pending()
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+class Uploader:
+    """
+    Upload stage that runs beside conversion: put() queues an object on a bounded
+    queue (blocking while it is full) and `threads` threads send them to the
+    backend, retrying failures with exponential backoff. With a manifest, objects
+    whose content was already uploaded are skipped; with check_etag, so are
+    objects the backend already holds byte for byte.
+    """
+
+    def __init__(self, backend, threads=16, queue_size=1000, retries=5, gzip_bodies=False, manifest=None,
+                 check_etag=False):
+        self.backend = backend
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.gzip_bodies = gzip_bodies
+        self.manifest = manifest
+        self.check_etag = check_etag
+        self.send_with_retries = backoff.on_exception(
+            backoff.expo, (BotoCoreError, ClientError, OSError), max_tries=retries, jitter=backoff.full_jitter
+        )(self.send)
+        self.failed = []
+        self.lock = threading.Lock()
+        self.threads = [threading.Thread(target=self.run, daemon=True) for _ in range(threads)]
+        for thread in self.threads:
+            thread.start()
+
+    def put(self, filename, body):
+        """Queue `body` for upload; returns False when the manifest shows it is already uploaded."""
+        digest = None
+        if self.manifest is not None:
+            digest = hashlib.sha256(body).hexdigest() + (":gzip" if self.gzip_bodies else "")
+            if self.manifest.unchanged(f"{self.backend.location}/{filename}", digest):
+                return False
+        self.queue.put((filename, body, digest))
         return True
-    except ClientError as e:
-        print(f"Error uploading {filename} to S3: {e}")
-        return False
 
-def process_file(filename, input_folder, output_folder, s3_client, s3_bucket, s3_prefix):
-    try:
-        path = os.path.join(input_folder, filename)
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+    def send(self, filename, body, digest):
+        # mtime=0 keeps gzip output, and so its ETag, the same for the same body
+        data = gzip.compress(body, mtime=0) if self.gzip_bodies else body
+        if not (self.check_etag and self.backend.etag(filename) == hashlib.md5(data).hexdigest()):
+            self.backend.put(filename, data, content_encoding="gzip" if self.gzip_bodies else None)
+        if self.manifest is not None:
+            self.manifest.record(f"{self.backend.location}/{filename}", digest)
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                filename, body, digest = item
+                try:
+                    self.send_with_retries(filename, body, digest)
+                except Exception as e:
+                    print(f"Error uploading {filename}: {e}")
+                    with self.lock:
+                        self.failed.append(filename)
+            finally:
+                self.queue.task_done()
+
+    def drain(self):
+        """Wait for every queued upload; returns the files that failed since the last drain."""
+        self.queue.join()
+        if self.manifest is not None:
+            self.manifest.commit()
+        with self.lock:
+            failed, self.failed = self.failed, []
+        return failed
+
+    def close(self):
+        failed = self.drain()
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        if self.manifest is not None:
+            self.manifest.close()
+        return failed
+
+def make_uploader(upload_config, s3_client=None):
+    """Uploader for the --upload_* settings; opens an S3 client when none is given."""
+    if upload_config["backend"] == "local":
+        backend = LocalBackend(upload_config["local_folder"], upload_config["bucket"], upload_config["prefix"])
+    else:
+        if s3_client is None:
+            s3_client, _ = connect_s3(upload_config["endpoint_url"], upload_config["threads"])
+        backend = S3Backend(s3_client, upload_config["bucket"], upload_config["prefix"])
+    manifest = UploadManifest(upload_config["manifest"]) if upload_config["manifest"] else None
+    return Uploader(backend, upload_config["threads"], upload_config["queue_size"], upload_config["retries"],
+                    upload_config["gzip"], manifest, upload_config["check_etag"])
+
+def load_batch(filenames, input_folder):
+    """Read a batch of stage-2 files; returns ([(filename, data)], [(filename, error result)])."""
+    loaded, failed = [], []
+    for filename in filenames:
+        try:
+            with open(os.path.join(input_folder, filename), "r", encoding="utf-8") as f:
+                loaded.append((filename, json.load(f)))
+        except Exception as e:
+            print(f"Failed to process {filename}: {e}")
+            failed.append((filename, f"error: {str(e)}"))
+    return loaded, failed
+
+def process_batch(filenames, input_folder, output_folder, uploader, compact=True):
+    """Convert a batch of files; returns (per-file results, coercion failures per field)."""
+    loaded, results = load_batch(filenames, input_folder)
+    failures = normalize_batch([data for _, data in loaded])
+    for filename, data in loaded:
+        results.append(process_file(filename, data, output_folder, uploader, compact))
+    return results, failures
+
+# Uploader of a worker process in --mode processes
+_worker = {}
+
+def init_worker(upload_config, reference_config, deterministic=False):
+    global reference, deterministic_ids
+    deterministic_ids = deterministic
+    # Forked workers inherit the parent's loaded tables; others load them (from the cache) on first use
+    if reference.config != reference_config:
+        reference = ReferenceData(**reference_config)
+    _worker["uploader"] = make_uploader(upload_config)
+
+def process_batch_in_worker(filenames, input_folder, output_folder, compact=True):
+    """Like process_batch, plus the normalization cache hits and misses of the batch."""
+    stats_before = normalization_stats()
+    results, failures = process_batch(filenames, input_folder, output_folder, _worker["uploader"], compact)
+    # Settle this batch's uploads so its results are final
+    failed_uploads = set(_worker["uploader"].drain())
+    results = [(filename, "s3_error") if filename in failed_uploads else (filename, status)
+               for filename, status in results]
+    return results, failures, normalization_stats() - stats_before
+
+def serialize_output(data, compact=True):
+    """
+    Encode lexicon data as UTF-8 JSON bytes, using orjson when it is installed.
+    Same encoding as stage 2's serialize_result: non-ASCII text is written as
+    UTF-8, not \\u escapes, which orjson cannot produce.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=0 if compact else orjson.OPT_INDENT_2)
+    if compact:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
 
+def process_file(filename, data, output_folder, uploader, compact=True):
+    try:
         mapped = transform(data)
         if mapped is None:
             return (filename, "skipped")
         
-        # Save locally
+        # Serialize once; the same bytes are saved locally and uploaded
+        body = serialize_output(mapped, compact)
         out_path = os.path.join(output_folder, filename)
-        with open(out_path, "w", encoding="utf-8") as outf:
-            json.dump(mapped, outf, indent=2)
+        with open(out_path, "wb") as outf:
+            outf.write(body)
         
-        # Upload to S3
-        upload_success = upload_to_s3(s3_client, mapped, filename, s3_bucket, s3_prefix)
-        if upload_success:
-            return (filename, "success")
-        else:
-            return (filename, "s3_error")
+        # Queue the upload; the uploader reports the ones that fail
+        if not uploader.put(filename, body):
+            return (filename, "unchanged")
+        return (filename, "success")
             
     except Exception as e:
         print(f"Failed to process {filename}: {e}")
         return (filename, f"error: {str(e)}")
 
+def connect_s3(endpoint_url=None, max_connections=10):
+    """
+    Return (S3 client, description of the credentials used); raises if none work.
+    The client pools `max_connections` connections, one per upload thread, and
+    makes a single attempt per request: Uploader retries failed uploads itself.
+    """
+    config = Config(max_pool_connections=max_connections, retries={"mode": "standard", "total_max_attempts": 1})
+    try:
+        # Try default credentials first
+        s3_client = boto3.client('s3', endpoint_url=endpoint_url, config=config)
+        # Test connection
+        s3_client.list_buckets()
+        return s3_client, "default AWS credentials"
+    except Exception:
+        # Try using a named profile
+        session = boto3.Session(profile_name="cerf-dev")
+        s3_client = session.client('s3', endpoint_url=endpoint_url, config=config)
+        # Test connection
+        s3_client.list_buckets()
+        return s3_client, "cerf-dev AWS profile credentials"
+
 def main():
     parser = argparse.ArgumentParser(description='Convert property data to lexicon format using threading and upload to S3.')
     parser.add_argument('--input_folder', type=str, default=INPUT_FOLDER, help='Input folder path')
     parser.add_argument('--output_folder', type=str, default=OUTPUT_FOLDER, help='Output folder path')
     parser.add_argument('--max_workers', type=int, default=30, help='Maximum number of worker threads')
+    parser.add_argument('--mode', choices=['threads', 'processes'], default='threads',
+                        help='Convert on threads of one process, or on a pool of processes for CPU-bound runs')
+    parser.add_argument('--processes', type=int, default=os.cpu_count(),
+                        help='Worker processes with --mode processes')
     parser.add_argument('--s3_bucket', type=str, default=S3_BUCKET, help='S3 bucket name')
     parser.add_argument('--s3_prefix', type=str, default=S3_PREFIX, help='S3 prefix/folder name')
+    parser.add_argument('--s3_endpoint_url', type=str, default=None,
+                        help='Endpoint of an S3-compatible store such as MinIO')
+    parser.add_argument('--upload_backend', choices=['s3', 'local'], default='s3',
+                        help='Upload to S3, or to a local folder standing in for it')
+    parser.add_argument('--local_upload_folder', type=str, default='s3_stand_in',
+                        help='Folder of the local backend; objects go to <folder>/<bucket>/<prefix>/')
+    parser.add_argument('--upload_threads', type=int, default=16,
+                        help='Concurrent uploads (per process with --mode processes)')
+    parser.add_argument('--upload_queue_size', type=int, default=1000,
+                        help='Converted files that may wait for upload before conversion pauses')
+    parser.add_argument('--upload_retries', type=int, default=5, help='Attempts per upload, with backoff')
+    parser.add_argument('--gzip_uploads', action='store_true',
+                        help='Upload gzip-compressed bodies with Content-Encoding: gzip')
+    parser.add_argument('--upload_manifest', type=str, default=UPLOAD_MANIFEST_PATH,
+                        help='SQLite file of uploaded content hashes; unchanged files are not uploaded again')
+    parser.add_argument('--no_upload_manifest', action='store_true', help='Upload every file')
+    parser.add_argument('--check_etag', action='store_true',
+                        help='Before uploading, skip objects whose stored ETag matches the body')
+    parser.add_argument('--owners_csv', type=str, default=OWNERS_CSV_PATH, help='CSV of parsed owner names')
+    parser.add_argument('--strap_csv', type=str, default=STRAP_CSV_PATH, help='County CSV of STRAP and site data')
+    parser.add_argument('--reference_cache', type=str, default=REFERENCE_CACHE_PATH,
+                        help='Pickle of the compiled owner and STRAP tables, rebuilt when a CSV changes')
+    parser.add_argument('--no_reference_cache', action='store_true', help='Always read the CSVs')
+    parser.add_argument('--photo_folder', type=str, default=PHOTO_FOLDER, help='Folder of <folio>.json photo lists')
+    parser.add_argument('--photo_index', type=str, default=PHOTO_INDEX_PATH,
+                        help='SQLite index compiled from the photo folder; lists added or removed since the last run '
+                             'are picked up when the folder changes')
+    parser.add_argument('--refresh_photo_index', action='store_true',
+                        help='Also check every photo list for changes, e.g. after the nightly in-place rewrite')
+    parser.add_argument('--rebuild_photo_index', action='store_true',
+                        help='Re-read every photo list instead of only the changed ones')
+    parser.add_argument('--deterministic_ids', action='store_true',
+                        help='Derive node IDs from the folio and node content, so unchanged input gives identical output')
+    parser.add_argument('--pretty', action='store_true',
+                        help='Write and upload indented JSON instead of compact JSON (larger S3 objects)')
+    parser.add_argument('--batch_size', type=int, default=BATCH_SIZE,
+                        help='Files read and normalized together by one worker thread')
     
     args = parser.parse_args()
     
+    global reference, deterministic_ids
+    deterministic_ids = args.deterministic_ids
+    
     input_folder = args.input_folder
     output_folder = args.output_folder
     max_workers = args.max_workers
     s3_bucket = args.s3_bucket
     s3_prefix = args.s3_prefix
     
+    upload_config = {
+        "backend": args.upload_backend,
+        "bucket": s3_bucket,
+        "prefix": s3_prefix,
+        "endpoint_url": args.s3_endpoint_url,
+        "local_folder": args.local_upload_folder,
+        "threads": args.upload_threads,
+        "queue_size": args.upload_queue_size,
+        "retries": args.upload_retries,
+        "gzip": args.gzip_uploads,
+        "manifest": None if args.no_upload_manifest else args.upload_manifest,
+        "check_etag": args.check_etag,
+    }
+    
     # Initialize S3 client
-    try:
-        # Try default credentials first
-        s3_client = boto3.client('s3')
-        # Test connection
-        s3_client.list_buckets()
-        print("Using default AWS credentials")
-    except Exception:
+    s3_client = None
+    if args.upload_backend == 's3':
         try:
-            # Try using a named profile
-            session = boto3.Session(profile_name="cerf-dev")
-            s3_client = session.client('s3')
-            # Test connection
-            s3_client.list_buckets()
-            print("Using cerf-dev AWS profile credentials")
+            s3_client, credentials = connect_s3(args.s3_endpoint_url, args.upload_threads)
+            print(f"Using {credentials}")
         except Exception as e:
             print(f"Error connecting to AWS: {e}")
             print("Please ensure AWS credentials are properly configured")
             return
+    uploader = make_uploader(upload_config, s3_client) if args.mode == 'threads' else None
     
     os.makedirs(output_folder, exist_ok=True)
     files = [f for f in os.listdir(input_folder) if f.endswith(".json")]
     
-    print(f"Processing {len(files)} files using {max_workers} threads...")
+    if args.mode == 'processes':
+        print(f"Processing {len(files)} files using {args.processes} processes...")
+    else:
+        print(f"Processing {len(files)} files using {max_workers} threads...")
     print(f"Files will be saved locally to {output_folder}")
-    print(f"Files will be uploaded to S3 bucket {s3_bucket} with prefix {s3_prefix}")
+    if orjson is None:
+        print("orjson not found, using the standard json encoder. For faster output, install it with: pip install orjson")
+    if args.upload_backend == 'local':
+        print(f"Files will be uploaded to {LocalBackend(args.local_upload_folder, s3_bucket, s3_prefix).describe()}")
+    else:
+        print(f"Files will be uploaded to S3 bucket {s3_bucket} with prefix {s3_prefix}")
+    
+    # Load the owner and STRAP tables and refresh the photo index up front, once,
+    # before any worker starts; workers only read them
+    load_start = time.time()
+    photo_index = args.photo_index
+    try:
+        compile_photo_index(args.photo_folder, args.photo_index, rebuild=args.rebuild_photo_index,
+                            refresh=args.refresh_photo_index)
+    except OSError as e:
+        # The index would serve photo lists that can no longer be checked
+        print(f"Warning: cannot read photo folder {args.photo_folder} ({e}); converting without photos")
+        photo_index = None
+    reference = ReferenceData(args.owners_csv, args.strap_csv,
+                              None if args.no_reference_cache else args.reference_cache,
+                              photo_index)
+    reference.load()
+    print(f"Loaded reference data in {time.time() - load_start:.2f} seconds")
     
     start_time = time.time()
     
     success_count = 0
     skipped_count = 0
+    unchanged_count = 0
     s3_error_count = 0
     error_count = 0
+    coercion_failures = Counter()
+    cache_stats = Counter()
+    batches = [files[i:i + args.batch_size] for i in range(0, len(files), args.batch_size)]
     
-    # Process files using ThreadPoolExecutor
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    if args.mode == 'processes':
+        # Forked workers share the owner and STRAP tables loaded above copy-on-write;
+        # each transforms on its own core while its uploader threads send the results
+        context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+        executor = ProcessPoolExecutor(max_workers=args.processes, mp_context=context,
+                                       initializer=init_worker, initargs=(upload_config, reference.config, deterministic_ids))
+    else:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    # Process batches of files
+    with executor:
         # Create a dictionary of futures
-        future_to_file = {
-            executor.submit(
-                process_file, filename, input_folder, output_folder, s3_client, s3_bucket, s3_prefix
-            ): filename for filename in files
-        }
+        if args.mode == 'processes':
+            future_to_batch = {
+                executor.submit(
+                    process_batch_in_worker, batch, input_folder, output_folder, not args.pretty
+                ): batch for batch in batches
+            }
+        else:
+            future_to_batch = {
+                executor.submit(
+                    process_batch, batch, input_folder, output_folder, uploader, not args.pretty
+                ): batch for batch in batches
+            }
         
         # Track progress with tqdm
-        for future in tqdm(as_completed(future_to_file), total=len(files), desc="Converting files"):
-            filename = future_to_file[future]
-            try:
-                result = future.result()
-                if result[1] == "success":
-                    success_count += 1
-                elif result[1] == "skipped":
-                    skipped_count += 1
-                elif result[1] == "s3_error":
-                    s3_error_count += 1
-                else:
-                    error_count += 1
-            except Exception as e:
-                print(f"Error processing {filename}: {e}")
-                error_count += 1
+        with tqdm(total=len(files), desc="Converting files") as progress:
+            for future in as_completed(future_to_batch):
+                batch = future_to_batch[future]
+                progress.update(len(batch))
+                try:
+                    batch_result = future.result()
+                except Exception as e:
+                    print(f"Error processing batch starting at {batch[0]}: {e}")
+                    error_count += len(batch)
+                    continue
+                results, failures = batch_result[:2]
+                coercion_failures.update(failures)
+                if args.mode == 'processes':
+                    cache_stats.update(batch_result[2])
+                for result in results:
+                    if result[1] == "success":
+                        success_count += 1
+                    elif result[1] == "skipped":
+                        skipped_count += 1
+                    elif result[1] == "unchanged":
+                        unchanged_count += 1
+                    elif result[1] == "s3_error":
+                        s3_error_count += 1
+                    else:
+                        error_count += 1
+    
+    if args.mode == 'threads':
+        cache_stats = normalization_stats()
+    if uploader is not None:
+        failed_uploads = uploader.close()
+        success_count -= len(failed_uploads)
+        s3_error_count += len(failed_uploads)
     
     end_time = time.time()
     duration = end_time - start_time
@@ -1251,10 +1880,20 @@ def main():
     print("\nProcessing complete!")
     print(f"Successful conversions and uploads: {success_count}")
     print(f"Skipped files: {skipped_count}")
+    print(f"Unchanged since the last upload: {unchanged_count}")
     print(f"S3 upload errors: {s3_error_count}")
     print(f"Processing errors: {error_count}")
     print(f"Total time taken: {duration:.2f} seconds")
     print(f"Average time per file: {duration/len(files):.2f} seconds")
+    if coercion_failures:
+        print("\nValues that could not be parsed, per field:")
+        for field, count in coercion_failures.most_common():
+            print(f"  {field}: {count}")
+    print("\nNormalization cache hit rates:")
+    for name in ("street names", "cities"):
+        lookups = cache_stats[f"{name} hits"] + cache_stats[f"{name} misses"]
+        if lookups:
+            print(f"  {name}: {cache_stats[f'{name} hits'] / lookups:.1%} of {lookups} lookups")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Time the condo and unit photo extractors on pages padded with a growing
+number of trailing <div>s. The "Photo Date" lookup is bounded to the photo's
+neighbourhood, so the time per call should stay flat as the page grows.
+
+    python benchmarks/bench_photo_date.py --padding 100 1000 10000
+"""
+import argparse
+
+from bs4 import BeautifulSoup
+
+from common import best_of, load_stage2
+
+CONDO_SECTION = """
+<div class="innerBox">
+  <div class="sectionSubTitle">Condominium Information</div>
+  <table class="detailsTableLeft"><tr><th>Complex Name</th><td>BAY POINTE</td></tr></table>
+  <table class="detailsTableLeft">
+    <tr><th class="subheader" colspan="4">Unit Detail</th></tr>
+    <tr><th>Unit</th><td>204</td><th>Floor</th><td>2</td></tr>
+    <tr><th class="subheader" colspan="4">Unit Subareas</th></tr>
+    <tr><th>Description</th><th>Heated</th><th>Area</th></tr>
+    <tr><td>BAS</td><td>Y</td><td>1,120</td></tr>
+    <tr><td colspan="3">
+      <div class="condo-flex-container">
+        <div><img src="/dotnet/photo/photo.aspx?FolioID=1"></div>
+        <div>Photo Date: January 2024</div>
+        <div><img src="/FloorPlan.aspx?FolioID=1"></div>
+      </div>
+    </td></tr>
+  </table>
+</div>
+"""
+
+UNIT_TABLE = """
+<table>
+  <tr><th>Unit Subareas</th></tr>
+  <tr><th>Description</th><th>Heated</th><th>Area</th></tr>
+  <tr><td>BAS</td><td>Y</td><td>1,120</td></tr>
+  <tr><td>
+    <div><img src="/dotnet/photo/photo.aspx?FolioID=1"></div>
+    <div>Photo Date: January 2024</div>
+  </td></tr>
+</table>
+"""
+
+
+def padded_page(fragment, padding):
+    filler = "".join(f"<div><div>Filler row {i}</div></div>" for i in range(padding))
+    return f"<html><body>{fragment}{filler}</body></html>"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bounded Photo Date lookup.")
+    parser.add_argument("--padding", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="Number of trailing <div>s to append to the page")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions per size")
+    args = parser.parse_args()
+
+    stage2 = load_stage2()
+    print(f"{'padding divs':>12}  {'condo (ms)':>10}  {'unit (ms)':>10}")
+    for padding in args.padding:
+        condo_soup = BeautifulSoup(padded_page(CONDO_SECTION, padding), "lxml")
+        condo_section = condo_soup.find("div", class_="innerBox")
+        unit_soup = BeautifulSoup(padded_page(UNIT_TABLE, padding), "lxml")
+        unit_table = unit_soup.find("table")
+
+        condo = stage2.extract_condo_info(condo_section)
+        _, photos = stage2.extract_unit_subareas_and_photos(unit_table)
+        assert condo["Photos and Footprint"]["Building Photo Date"] == "Photo Date: January 2024"
+        assert photos["Building Photo Date"] == "Photo Date: January 2024"
+
+        condo_ms = best_of(lambda: stage2.extract_condo_info(condo_section), args.repeat) * 1000
+        unit_ms = best_of(lambda: stage2.extract_unit_subareas_and_photos(unit_table), args.repeat) * 1000
+        print(f"{padding:>12}  {condo_ms:>10.3f}  {unit_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Time stage 3's remove_empty_values, run on every converted document, on
+Lexicon documents of commercial parcels with many owners and sales, against
+the same function at another revision. Both must return the same document.
+
+    python benchmarks/bench_remove_empty_values.py --sales 20 200 1000
+    python benchmarks/bench_remove_empty_values.py --baseline git:main~5
+"""
+import argparse
+import random
+import tempfile
+
+from common import STAGE3_SCRIPT, best_of, load_revision, load_script
+
+
+def maybe(rng, value, empty_rate=0.3):
+    """`value`, or one of the placeholders transform leaves behind for missing data."""
+    return rng.choice(["", None, "N/A"]) if rng.random() < empty_rate else value
+
+
+def lexicon_document(sales, owners, seed=0):
+    """A document shaped like transform's output, before cleaning, with `sales` sales and `owners` owners."""
+    rng = random.Random(seed)
+    ids = iter(range(1, 10 ** 9))
+
+    def node(node_type, **fields):
+        return {"@id": f"01DXF6DT00{next(ids):016d}", "@type": node_type, **fields}
+
+    document = {key: [] for key in ("companies", "people", "communications", "ownerships", "property_valuations",
+                                    "properties", "documents", "addresses", "sales_transactions", "relationships")}
+    for i in range(owners):
+        address = node("address", address_line_1=f"{rng.randint(1, 9999)} MAIN ST",
+                       address_line_2=maybe(rng, f"STE {i}", 0.8), city_name="Fort Myers", state_code="FL",
+                       postal_code=maybe(rng, "33901"), country_name="USA")
+        communication = node("communication", has_mailing_address=address["@id"])
+        owner = node("company", name=f"OWNER {i} LLC", has_communication_method=communication["@id"])
+        document["addresses"].append(address)
+        document["communications"].append(communication)
+        document["companies"].append(owner)
+        document["ownerships"].append(node("ownership", has_owner_company=owner["@id"], owned_property="p",
+                                           date_acquired=maybe(rng, "2021-03-04")))
+    for i in range(sales):
+        price = rng.choice([0.0, 100.0, 250000.0])
+        sale = node("sales_transaction", sales_date=maybe(rng, "2019-05-06", 0.1), sales_transaction_amount=price)
+        document["sales_transactions"].append(sale)
+        document["documents"].append(node("document", instrument_number=maybe(rng, str(i)),
+                                          document_identifier="Warranty Deed", document_date=sale["sales_date"],
+                                          document_url=f"https://or.leeclerk.org/{i}"))
+        document["relationships"].append(node("finance_relation", has_property="p",
+                                              has_sales_transactions=sale["@id"],
+                                              has_ownership=maybe(rng, [o["@id"] for o in document["ownerships"]], 0.9)))
+        if price:
+            document["property_valuations"].append(node("property_valuation", valuation_date=sale["sales_date"],
+                                                        actual_value=price, valuation_method_type="SalesTransaction"))
+    document["properties"].append(node("property", parcel_identifier="12345678901234567", lot=maybe(rng, "4"),
+                                       block=None, section="01", township="44", range="24", half_bathroom_count=None,
+                                       bedroom_count=0, has_photos=[]))
+    return document
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark remove_empty_values on large Lexicon documents.")
+    parser.add_argument("--sales", type=int, nargs="+", default=[20, 200, 1000], help="Sales per document")
+    parser.add_argument("--owners", type=int, default=50, help="Owners per document")
+    parser.add_argument("--baseline", default="git:HEAD",
+                        help="Revision to compare against, as git:REF (default: git:HEAD)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions per size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        baseline = load_revision(args.baseline[len("git:"):], STAGE3_SCRIPT, scratch)
+        candidate = load_script(STAGE3_SCRIPT, "candidate")
+
+    print(f"{'sales':>6}  {'baseline (ms)':>13}  {'candidate (ms)':>14}  {'speed-up':>8}")
+    for sales in args.sales:
+        document = lexicon_document(sales, args.owners)
+        assert baseline.remove_empty_values(document) == candidate.remove_empty_values(document)
+
+        baseline_ms = best_of(lambda: baseline.remove_empty_values(document), args.repeat) * 1000
+        candidate_ms = best_of(lambda: candidate.remove_empty_values(document), args.repeat) * 1000
+        print(f"{sales:>6}  {baseline_ms:>13.2f}  {candidate_ms:>14.2f}  {baseline_ms / candidate_ms:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark stage 2 (2-data_from_html_folder_to_raw_json_data.py) on a corpus of
+parcel pages, by default a freshly generated synthetic one.
+
+For every process count it reports pages/sec, the speed-up over one process,
+mean CPU time per page and the peak RSS of the busiest worker. Results can be
+saved with --json to compare runs and catch regressions.
+
+    python benchmarks/bench_stage2.py --count 300 --processes 1 2 4 8
+    python benchmarks/bench_stage2.py --input lee_output --csv lee_input.csv
+"""
+import argparse
+import json
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from common import load_stage2
+from generate_lee_pages import generate_corpus
+
+stage2 = load_stage2()
+
+
+def timed_process(task):
+    """Run stage 2 on one page; returns (pid, cpu seconds, peak RSS KiB, ok)."""
+    cpu_start = time.process_time()
+    result = stage2.process_html_file(task)
+    cpu = time.process_time() - cpu_start
+    return os.getpid(), cpu, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, result[3] is None
+
+
+def run(html_files, lookup_path, processes, output_options):
+    tasks = [(filepath, lookup_path, 0, output_options, False, None) for filepath in html_files]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        outcomes = list(executor.map(timed_process, tasks, chunksize=8))
+    wall = time.perf_counter() - start
+
+    peak_rss = {}
+    for pid, _, rss, _ in outcomes:
+        peak_rss[pid] = max(peak_rss.get(pid, 0), rss)
+    return {
+        "processes": processes,
+        "pages": len(outcomes),
+        "failed": sum(1 for outcome in outcomes if not outcome[3]),
+        "wall_seconds": wall,
+        "pages_per_second": len(outcomes) / wall,
+        "cpu_ms_per_page": sum(outcome[1] for outcome in outcomes) / len(outcomes) * 1000,
+        "peak_worker_rss_mib": max(peak_rss.values()) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark stage-2 extraction throughput and scaling.")
+    parser.add_argument("--input", help="Folder of .html pages (default: generate a synthetic corpus)")
+    parser.add_argument("--csv", help="County CSV for --input (default: parcels.csv of the synthetic corpus)")
+    parser.add_argument("--count", type=int, default=200, help="Pages to generate when --input is not given")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic corpus")
+    parser.add_argument("--processes", type=int, nargs="+",
+                        default=sorted({1, 2, 4, max(1, os.cpu_count() - 1)}),
+                        help="Process counts to measure")
+    parser.add_argument("--compact", action="store_true", help="Benchmark compact JSON serialization")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        input_folder = args.input
+        csv_path = args.csv
+        if not input_folder:
+            input_folder = os.path.join(scratch, "pages")
+            csv_path = generate_corpus(input_folder, args.count, args.seed)
+
+        lookup_path = None
+        if csv_path:
+            lookup_path = stage2.compile_folio_lookup(csv_path, os.path.join(scratch, "lookup.sqlite"))
+
+        html_files = sorted(os.path.join(input_folder, f) for f in os.listdir(input_folder) if f.endswith(".html"))
+        page_mib = sum(os.path.getsize(f) for f in html_files) / len(html_files) / 1024 / 1024
+        print(f"{len(html_files)} pages, {page_mib * 1024:.0f} KiB on average")
+
+        output_options = {"sink": "files", "compact": args.compact}
+        results = []
+        print(f"{'processes':>9} {'pages/s':>9} {'speed-up':>9} {'cpu ms/page':>12} {'peak RSS MiB':>13} {'failed':>7}")
+        for processes in args.processes:
+            result = run(html_files, lookup_path, processes, output_options)
+            results.append(result)
+            speedup = result["pages_per_second"] / results[0]["pages_per_second"]
+            print(f"{processes:>9} {result['pages_per_second']:>9.1f} {speedup:>8.2f}x "
+                  f"{result['cpu_ms_per_page']:>12.2f} {result['peak_worker_rss_mib']:>13.1f} {result['failed']:>7}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"pages": len(html_files), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
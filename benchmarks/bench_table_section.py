@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Time the generic section-table extractor (extract_table_section) on sales-
+and permit-heavy pages, against the same function at another revision. The
+two implementations must produce identical rows.
+
+    python benchmarks/bench_table_section.py --rows 50 200 800
+    python benchmarks/bench_table_section.py --baseline git:main~5
+"""
+import argparse
+import random
+import tempfile
+
+from bs4 import BeautifulSoup
+
+from common import STAGE2_SCRIPT, best_of, load_revision, load_script
+from generate_lee_pages import make_parcel, permits_box, property_data_box, sales_box
+
+
+def heavy_page(rows, seed=0):
+    """A page with `rows` sales and `rows` permits, the bulk of cells on commercial parcels."""
+    rng = random.Random(seed)
+    parcel = make_parcel(rng, 0)
+    sections = [property_data_box(rng, parcel), sales_box(rng, rows), permits_box(rng, rows)]
+    return f"<html><body>{''.join(sections)}</body></html>"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the generic section-table extractor.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[50, 200, 800],
+                        help="Sales and permit rows per page")
+    parser.add_argument("--baseline", default="git:HEAD",
+                        help="Revision to compare against, as git:REF (default: git:HEAD)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions per size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        baseline = load_revision(args.baseline[len("git:"):], STAGE2_SCRIPT, scratch)
+        candidate = load_script(STAGE2_SCRIPT, "candidate")
+
+    print(f"{'rows':>6}  {'baseline (ms)':>13}  {'candidate (ms)':>14}  {'speed-up':>8}")
+    for rows in args.rows:
+        soup = BeautifulSoup(heavy_page(rows), "lxml")
+        boxes = [box for box in soup.select("div.box") if box.find("table")]
+        assert [baseline.extract_table_section(box) for box in boxes] == \
+               [candidate.extract_table_section(box) for box in boxes]
+
+        baseline_ms = best_of(lambda: [baseline.extract_table_section(box) for box in boxes], args.repeat) * 1000
+        candidate_ms = best_of(lambda: [candidate.extract_table_section(box) for box in boxes], args.repeat) * 1000
+        print(f"{rows:>6}  {baseline_ms:>13.2f}  {candidate_ms:>14.2f}  {baseline_ms / candidate_ms:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Helpers shared by the benchmark scripts in this folder."""
+import importlib.util
+import os
+import subprocess
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STAGE2_SCRIPT = "2-data_from_html_folder_to_raw_json_data.py"
+STAGE3_SCRIPT = "3-convert_to_lexicon.py"
+
+
+def load_script(filename, module_name):
+    """Import one of the numbered pipeline scripts (or any .py file) as a module."""
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(REPO_ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_stage2():
+    return load_script(STAGE2_SCRIPT, "stage2")
+
+
+def load_revision(ref, script, scratch, module_name="baseline"):
+    """Import `script` as it was at git revision `ref`, via a copy written to `scratch`."""
+    source = subprocess.run(["git", "show", f"{ref}:{script}"], cwd=REPO_ROOT,
+                            check=True, capture_output=True).stdout
+    path = os.path.join(scratch, f"{module_name}.py")
+    with open(path, "wb") as f:
+        f.write(source)
+    return load_script(path, module_name)
+
+
+def best_of(func, repeat=5, number=1):
+    """Best wall time in seconds for `number` calls of `func`, over `repeat` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return best / number
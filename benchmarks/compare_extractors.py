@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Run two stage-2 extractor implementations over the same pages, diff their
+output structurally and time them side by side.
+
+An implementation is given as SCRIPT[@PARSER]:
+  - SCRIPT is a path to a stage-2 script, or git:REF for the stage-2 script
+    at a git revision (e.g. git:HEAD, git:main~3)
+  - PARSER is the BeautifulSoup parser to use (lxml, html.parser, html5lib);
+    lxml when omitted
+or as golden:DIR, a folder of previously written <folio>.json outputs.
+
+    # working tree vs. last commit on a synthetic corpus
+    python benchmarks/compare_extractors.py
+    # same code, two parser engines, on real pages
+    python benchmarks/compare_extractors.py --input lee_output --csv lee_input.csv \\
+        --baseline 2-data_from_html_folder_to_raw_json_data.py@lxml \\
+        --candidate 2-data_from_html_folder_to_raw_json_data.py@html.parser
+"""
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+from bs4 import BeautifulSoup
+
+from common import REPO_ROOT, STAGE2_SCRIPT, load_script
+from generate_lee_pages import generate_corpus
+
+
+class Engine:
+    """One extractor implementation: a stage-2 module plus a parser, or a golden folder."""
+
+    def __init__(self, spec, csv_path, scratch, index):
+        self.spec = spec
+        self.seconds = 0.0
+        self.golden_folder = None
+        if spec.startswith("golden:"):
+            self.golden_folder = spec[len("golden:"):]
+            return
+
+        script, _, self.parser = spec.partition("@")
+        self.parser = self.parser or "lxml"
+        if script.startswith("git:"):
+            source = subprocess.run(["git", "show", f"{script[len('git:'):]}:{STAGE2_SCRIPT}"], cwd=REPO_ROOT,
+                                    check=True, capture_output=True).stdout
+            script = os.path.join(scratch, f"engine_{index}.py")
+            with open(script, "wb") as f:
+                f.write(source)
+        self.module = load_script(os.path.abspath(script), f"engine_{index}")
+
+        # Older revisions looked folios up in a DataFrame, newer ones in a compiled lookup
+        self.lookup = None
+        if csv_path and hasattr(self.module, "compile_folio_lookup"):
+            db_path = os.path.join(scratch, f"engine_{index}.sqlite")
+            self.lookup = self.module.get_folio_lookup(self.module.compile_folio_lookup(csv_path, db_path))
+        elif csv_path and hasattr(self.module, "get_dataframe"):
+            self.lookup = self.module.get_dataframe(csv_path)
+
+    def extract(self, filepath):
+        folio_id = os.path.splitext(os.path.basename(filepath))[0]
+        if self.golden_folder:
+            with open(os.path.join(self.golden_folder, f"{folio_id}.json"), encoding="utf-8") as f:
+                return json.load(f)
+
+        with open(filepath, "r", encoding="utf-8") as f:
+            html = f.read()
+        start = time.perf_counter()
+        soup = BeautifulSoup(html, self.parser)
+        result = self.module.parse_tables(soup, self.lookup, folio_id=folio_id)
+        self.seconds += time.perf_counter() - start
+        # Round-trip so both sides are compared as the JSON that stage 3 reads
+        return json.loads(json.dumps(result))
+
+
+def diff(baseline, candidate, path="$"):
+    """Yield one line per structural difference between two JSON values."""
+    if type(baseline) is not type(candidate):
+        yield f"{path}: {baseline!r} != {candidate!r}"
+    elif isinstance(baseline, dict):
+        for key in baseline.keys() | candidate.keys():
+            child = f"{path}.{key}"
+            if key not in candidate:
+                yield f"{child}: missing in candidate"
+            elif key not in baseline:
+                yield f"{child}: only in candidate"
+            else:
+                yield from diff(baseline[key], candidate[key], child)
+    elif isinstance(baseline, list):
+        if len(baseline) != len(candidate):
+            yield f"{path}: {len(baseline)} items != {len(candidate)} items"
+        for i, (left, right) in enumerate(zip(baseline, candidate)):
+            yield from diff(left, right, f"{path}[{i}]")
+    elif baseline != candidate:
+        yield f"{path}: {baseline!r} != {candidate!r}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two stage-2 extractor implementations.")
+    parser.add_argument("--baseline", default="git:HEAD", help="Reference implementation (default: git:HEAD)")
+    parser.add_argument("--candidate", default=os.path.join(REPO_ROOT, STAGE2_SCRIPT),
+                        help="Implementation under test (default: working tree)")
+    parser.add_argument("--input", help="Folder of .html pages (default: generate a synthetic corpus)")
+    parser.add_argument("--csv", help="County CSV for --input (default: parcels.csv of the synthetic corpus)")
+    parser.add_argument("--count", type=int, default=200, help="Pages to generate when --input is not given")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic corpus")
+    parser.add_argument("--show", type=int, default=5, help="Mismatching pages to print, with their differences")
+    parser.add_argument("--report", help="Write every mismatch to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        input_folder = args.input
+        csv_path = args.csv
+        if not input_folder:
+            input_folder = os.path.join(scratch, "pages")
+            csv_path = generate_corpus(input_folder, args.count, args.seed)
+
+        engines = [Engine(spec, csv_path, scratch, i) for i, spec in enumerate([args.baseline, args.candidate])]
+        html_files = sorted(os.path.join(input_folder, f) for f in os.listdir(input_folder) if f.endswith(".html"))
+
+        mismatches = {}
+        for filepath in html_files:
+            baseline, candidate = (engine.extract(filepath) for engine in engines)
+            differences = sorted(diff(baseline, candidate))
+            if differences:
+                mismatches[os.path.basename(filepath)] = differences
+
+    print(f"{len(html_files)} pages: {len(html_files) - len(mismatches)} identical, {len(mismatches)} different")
+    for page, differences in list(mismatches.items())[:args.show]:
+        print(f"\n{page} ({len(differences)} differences)")
+        for line in differences[:10]:
+            print(f"  {line}")
+
+    print(f"\n{'engine':<60} {'total s':>9} {'ms/page':>9}")
+    for engine in engines:
+        if engine.golden_folder:
+            print(f"{engine.spec:<60} {'-':>9} {'-':>9}")
+        else:
+            print(f"{engine.spec:<60} {engine.seconds:>9.2f} {engine.seconds / len(html_files) * 1000:>9.2f}")
+    timed = [engine for engine in engines if not engine.golden_folder]
+    if len(timed) == 2 and timed[1].seconds:
+        print(f"candidate speed-up: {timed[0].seconds / timed[1].seconds:.2f}x")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(mismatches, f, indent=2)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic Lee County DisplayParcel.aspx pages for benchmarking stage 2.
+
+The pages follow the markup the stage-2 extractors look for (property data,
+appraisal details, land tracts, buildings with photos, condominium sections,
+sales, permits, TRIM values, flood/garbage/real property tag boxes) with a
+random number of buildings, sales and permits per page. A CSV with the
+matching county rows is written next to the pages so the folio lookup works.
+
+    python benchmarks/generate_lee_pages.py --count 500 --output synthetic_lee
+"""
+import argparse
+import csv
+import os
+import random
+from html import escape
+
+STREETS = ["RHODE ISLAND AVE", "PROVIDENCE ST", "SW 23RD PL", "NE 7TH TER", "DEL PRADO BLVD S",
+           "SANTA BARBARA BLVD", "CAPE CORAL PKWY W", "MCGREGOR BLVD", "PALM BEACH BLVD", "N RIVER RD"]
+CITIES = [("FORT MYERS", "33916"), ("CAPE CORAL", "33904"), ("LEHIGH ACRES", "33936"),
+          ("BONITA SPRINGS", "34135"), ("ESTERO", "33928"), ("SANIBEL", "33957")]
+SURNAMES = ["BURKS", "WILBOURNE", "GARCIA", "SMITH", "NGUYEN", "JOHNSON", "MILLER", "DAVIS", "LOPEZ"]
+GIVEN = ["MICHAEL D", "LISA A", "KATHRYN M", "ALEXANDER", "MARIA", "JOHN", "SUSAN", "ROBERT J"]
+USE_CODES = [("0100", "SINGLE FAMILY RESIDENTIAL"), ("0400", "CONDOMINIUM"), ("0800", "MULTI-FAMILY LESS THAN 10"),
+             ("0200", "MOBILE HOME"), ("1100", "STORES, ONE STORY"), ("1700", "OFFICE BUILDINGS")]
+SUBAREAS = [("BAS - BASE", "Y"), ("FGR - FINISHED GARAGE", "N"), ("FOP - FINISHED OPEN PORCH", "N"),
+            ("FUS - FINISHED UPPER STORY", "Y"), ("FSP - FINISHED SCREENED PORCH", "N")]
+FEATURES = ["POOL - RESIDENTIAL", "SCREEN ENCLOSURE", "FENCE - WOOD", "SPA", "DOCK - CONCRETE", "PATIO"]
+PERMIT_TYPES = ["Roof", "Electrical", "Plumbing", "Mechanical", "Pool", "Addition", "Window/Door"]
+
+CSV_COLUMNS = ["FolioID", "STRAP", "SiteStreetNumber", "SiteStreetName", "SiteUnit", "SiteCity", "SiteZIP",
+               "OwnerName", "Others", "OwnerAddress1", "OwnerAddress2", "OwnerCity", "OwnerState", "OwnerZip",
+               "OwnerCountry"]
+
+
+def date(rng, start_year=1970, end_year=2025):
+    return f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/{rng.randint(start_year, end_year)}"
+
+
+def section_box(title, body, box_id=None):
+    id_attr = f' id="{box_id}"' if box_id else ""
+    return (f'<div class="box"{id_attr}><div class="sectionTitle">'
+            f'<a class="nonLinkLinks">{escape(title)}</a> Generated on 01/01/2025</div>{body}</div>')
+
+
+def table(headers, rows, css_class=None):
+    class_attr = f' class="{css_class}"' if css_class else ""
+    head = "".join(f"<th>{escape(h)}</th>" for h in headers)
+    body = "".join("<tr>" + "".join(f"<td>{cell}</td>" for cell in row) + "</tr>" for row in rows)
+    return f"<table{class_attr}><tr>{head}</tr>{body}</table>"
+
+
+def money(rng, low, high):
+    return f"${rng.randint(low, high):,}"
+
+
+def property_data_box(rng, parcel):
+    site_rows = [[escape(parcel["site_address"]), escape(parcel["city"]), parcel["zip"], date(rng, 2000)]]
+    body = (f"<div>STRAP: {parcel['strap']} Folio ID: {parcel['folio_id']}</div>"
+            + table(["Site Address", "City", "Zip", "Maintenance Date"], site_rows, "detailsTable")
+            + f'<div id="divDisplayParcelOwner"><div class="textPanel">{escape(parcel["owner"])}<br/>'
+              f'{escape(parcel["site_address"])}<br/>{escape(parcel["city"])} FL {parcel["zip"]}</div></div>')
+    return section_box("Property Data", body)
+
+
+def description_block(rng, parcel):
+    details = [("Gross Living Area", f"{rng.randint(700, 4500):,}"),
+               ("Gross Building Area", f"{rng.randint(900, 6000):,}"),
+               ("1st Year Building on Tax Roll", str(rng.randint(1950, 2024))),
+               ("Total Bedrooms / Bathrooms", f"{rng.randint(1, 6)}/{rng.choice(['1', '1.5', '2', '2.5', '3'])}"),
+               ("Latitude", f"26.{rng.randint(100000, 999999)}"), ("Longitude>", f"-81.{rng.randint(100000, 999999)}")]
+    rows = "".join(f"<tr><th>{escape(k)}</th><td>{escape(v)}</td></tr>" for k, v in details)
+    location = (
+        "<table class=\"appraisalDetailsLocation\">"
+        "<tr><th>Section</th><th>Township</th><th>Range</th></tr>"
+        f"<tr><td>{rng.randint(1, 36)}</td><td>44</td><td>24</td></tr>"
+        "<tr><th>Block</th><th>Lot</th><th>Municipality</th></tr>"
+        f"<tr><td>{rng.choice('ABCDEFG')}</td><td>{rng.randint(1, 40)}</td><td>{escape(parcel['city'])}</td></tr>"
+        "</table>"
+    )
+    return (
+        '<div class="sectionSubTitle">Property Description</div>'
+        f'<div class="textPanel">{escape(parcel["legal"])}</div>'
+        f'<table class="appraisalDetails">{rows}</table>{location}'
+        f'<a href="https://maps.google.com/?q={parcel["folio_id"]}">Google Maps</a>'
+        f'<a href="https://gissvr.leepa.org/TaxMapViewer/?folioid={parcel["folio_id"]}">Tax Map Viewer</a>'
+        f'<a href="https://pictometry.leepa.org/?folioid={parcel["folio_id"]}">Pictometry Aerial Viewer</a>'
+        f'<div class="imgDisplay"><a href="/dotnet/photo/photo.aspx?FolioID={parcel["folio_id"]}">'
+        f'<img src="/dotnet/photo/photo.aspx?FolioID={parcel["folio_id"]}&amp;Height=300&amp;Width=400"/></a></div>'
+        f'<div id="divDisplayParcelTaxMap"><img src="https://gissvr.leepa.org/TaxMapImage.aspx?'
+        f'FolioID={parcel["folio_id"]}&amp;amp;Size=small"/></div>'
+        f'<div class="LastInspectionDiv">Last Inspection Date: {date(rng, 2015)}</div>'
+    )
+
+
+def photo_cell(rng, folio_id, index):
+    return (f'<tr><td colspan="4"><div><div><img src="/dotnet/photo/photo.aspx?FolioID={folio_id}&amp;Bldg={index}"/>'
+            f'</div><div>Photo Date: {rng.choice(["January", "March", "June", "October"])} {rng.randint(2010, 2024)}'
+            f'</div><div><img src="/dotnet/FloorPlan.aspx?FolioID={folio_id}&amp;Bldg={index}"/></div></div></td></tr>')
+
+
+def building_table(rng, folio_id, index, count):
+    rows = [f'<tr><th class="subheader" colspan="4">Building {index} of {count}</th></tr>',
+            '<tr><th class="subheader" colspan="4">Building Characteristics</th></tr>',
+            "<tr><th>Improvement Type</th><th>Model Type</th><th>Stories</th><th>Living Units</th></tr>",
+            f"<tr><td>{rng.choice(['Ranch', 'Cottage/Bungalow', 'Florida Ranch', 'Office'])}</td>"
+            f"<td>{rng.choice(['Single Family', 'Commercial'])}</td><td>{rng.randint(1, 3)}</td>"
+            f"<td>{rng.randint(1, 4)}</td></tr>",
+            "<tr><th>Bedrooms</th><th>Bathrooms</th><th>Year Built</th><th>Effective Year Built</th></tr>",
+            f"<tr><td>{rng.randint(1, 6)}</td><td>{rng.randint(1, 4)}</td><td>{rng.randint(1950, 2024)}</td>"
+            f"<td>{rng.randint(1970, 2024)}</td></tr>",
+            '<tr><th class="subheader" colspan="4">Building Subareas</th></tr>',
+            "<tr><th>Description</th><th>Heated / Under Air</th><th>Area (Sq Ft)</th></tr>"]
+    for description, heated in rng.sample(SUBAREAS, rng.randint(2, len(SUBAREAS))):
+        rows.append(f"<tr><td>{escape(description)}</td><td>{heated}</td><td>{rng.randint(40, 2500):,}</td></tr>")
+    rows.append('<tr><th class="subheader" colspan="4">Building Features</th></tr>')
+    rows.append("<tr><th>Description</th><th>Year Added</th><th>Units</th></tr>")
+    for feature in rng.sample(FEATURES, rng.randint(1, 4)):
+        rows.append(f"<tr><td>{feature}</td><td>{rng.randint(1970, 2024)}</td><td>{rng.randint(1, 600)}</td></tr>")
+    rows.append(photo_cell(rng, folio_id, index))
+    return f'<table class="appraisalAttributes">{"".join(rows)}</table>'
+
+
+def condo_box(rng, folio_id):
+    amenities = "".join(f"<span>{a}</span>" for a in rng.sample(["Pool", "Tennis", "Clubhouse", "Gym", "Dock"], 3))
+    unit_rows = [
+        '<tr><th class="subheader" colspan="4">Unit Detail</th></tr>',
+        f"<tr><th>Unit</th><td>{rng.randint(101, 1210)}</td><th>Floor</th><td>{rng.randint(1, 12)}</td></tr>",
+        f"<tr><th>View</th><td>{rng.choice(['Water', 'Golf', 'Pool'])}</td>"
+        f"<th>Bedrooms</th><td>{rng.randint(1, 3)}</td></tr>",
+        '<tr><th class="subheader" colspan="4">Unit Subareas</th></tr>',
+        "<tr><th>Description</th><th>Heated / Under Air</th><th>Area (Sq Ft)</th></tr>",
+    ]
+    for description, heated in rng.sample(SUBAREAS, 2):
+        unit_rows.append(f"<tr><td>{escape(description)}</td><td>{heated}</td><td>{rng.randint(40, 1800):,}</td></tr>")
+    unit_rows.append(
+        f'<tr><td colspan="4"><div class="condo-flex-container">'
+        f'<div><img src="/dotnet/photo/photo.aspx?FolioID={folio_id}"/></div>'
+        f'<div>Photo Date: {rng.choice(["April", "August"])} {rng.randint(2010, 2024)}</div>'
+        f'<div><img src="/dotnet/FloorPlan.aspx?FolioID={folio_id}&amp;Unit=1"/></div></div></td></tr>')
+    return (
+        '<div class="innerBox"><div class="sectionSubTitle">Condominium Information</div>'
+        f'<table class="detailsTableLeft"><tr><th>Complex Name</th><td>{rng.choice(SURNAMES)} POINTE</td></tr>'
+        f'<tr><th>Units in Complex</th><td>{rng.randint(12, 400)}</td></tr></table>'
+        f'<div class="items">{amenities}</div>'
+        f'<table class="detailsTableLeft">{"".join(unit_rows)}</table></div>'
+    )
+
+
+def property_details_box(rng, parcel, buildings, condo):
+    land = (
+        '<table class="appraisalAttributes"><tr><th colspan="4">Land Tracts</th></tr>'
+        "<tr><th>Use Code</th><th>Use Code Description</th><th>Number of Units</th><th>Unit of Measure</th></tr>"
+        f"<tr><td>{parcel['use_code']}</td><td>{parcel['use_description']}</td>"
+        f"<td>{rng.randint(5000, 40000):,}</td><td>Square Feet</td></tr></table>"
+        '<table class="appraisalAttributes"><tr><th colspan="3">Land Features</th></tr>'
+        "<tr><th>Description</th><th>Year Added</th><th>Units</th></tr>"
+        + "".join(f"<tr><td>{f}</td><td>{rng.randint(1970, 2024)}</td><td>{rng.randint(1, 400)}</td></tr>"
+                  for f in rng.sample(FEATURES, 2))
+        + "</table>"
+    )
+    building_tables = "".join(building_table(rng, parcel["folio_id"], i, buildings) for i in range(1, buildings + 1))
+    body = f'<div class="innerBox">{land}{building_tables}</div>'
+    if condo:
+        body += condo_box(rng, parcel["folio_id"])
+    return section_box("Property Details", body, box_id="PropertyDetailsCurrent")
+
+
+def sales_box(rng, sales):
+    rows = []
+    for _ in range(sales):
+        clerk = str(rng.randint(2000000000000, 2025999999999))
+        rows.append([money(rng, 100, 2500000), date(rng),
+                     f'<a href="https://or.leeclerk.org/LandMarkWeb/Document/Index?InstrNum={clerk}">{clerk}</a>'
+                     f"Sales Questionnaire Complete",
+                     rng.choice(["Qualified (01)", "Disqualified (02)", "Unqualified (05)"]),
+                     rng.choice(["V", "I"])])
+    return section_box("Sales / Transactions",
+                       table(["Sale Price", "Date", "ClerkFile Number", "Type", "Vacant/Improved"], rows))
+
+
+def permits_box(rng, permits):
+    rows = []
+    for _ in range(permits):
+        number = f"{rng.choice(['BLD', 'ELE', 'PLM', 'MEC'])}{rng.randint(2000, 2025)}-{rng.randint(1, 99999):05d}"
+        rows.append([f'<a href="https://aca-prod.accela.com/LEECO/Cap/CapDetail.aspx?permit={number}">{number}</a>',
+                     rng.choice(PERMIT_TYPES), date(rng, 1995)])
+    return section_box("Permit Details", table(["Permit Number", "Permit Type", "Date"], rows))
+
+
+def trim_box(rng, years):
+    rows = []
+    for year in range(2025, 2025 - years, -1):
+        just = rng.randint(50000, 900000)
+        exemptions = rng.choice([0, 25000, 50000])
+        rows.append([str(year), f"{just:,}", f"{int(just * 0.9):,}", f"{int(just * 0.8):,}", f"{exemptions:,}",
+                     f"{max(0, int(just * 0.8) - exemptions):,}"])
+    return section_box("Property Values / Exemptions / TRIM Notices",
+                       table(["Tax Year", "Just", "Market Assessed", "Capped Assessed", "Exemptions", "Taxable"], rows))
+
+
+def taxing_box(rng):
+    authorities = ["LEE COUNTY GENERAL REVENUE", "LEE COUNTY SCHOOL BOARD", "SOUTH FLORIDA WATER MGMT",
+                   "LEE COUNTY MOSQUITO CONTROL", "WEST COAST INLAND NAVIGATION"]
+    rows = [[a, f"PO BOX {rng.randint(100, 9999)}<br/>FORT MYERS FL 33902"] for a in authorities]
+    return section_box("Taxing Authorities", table(["Authority", "Mailing Address"], rows))
+
+
+def flood_box(rng):
+    body = (
+        '<div id="ElevationDetails"><table class="detailsTable">'
+        '<tr><td colspan="5"><a href="https://www.fema.gov/flood-insurance">Flood Insurance</a></td></tr>'
+        "<tr><th>Community</th><th>Panel</th><th>Version</th><th>Date</th><th>Evacuation Zone</th></tr>"
+        f"<tr><td>125124</td><td>{rng.randint(100, 999)}</td><td>F</td><td>{date(rng, 2008, 2020)}</td>"
+        f"<td>{rng.choice('ABCDE')}</td></tr></table></div>"
+    )
+    return section_box("Flood and Storm Information", body)
+
+
+def garbage_box(rng):
+    body = (
+        '<div id="GarbageDetails"><table class="detailsTable">'
+        "<tr><th>Roll Type</th><th>Category</th><th>Unit / Area</th><th>Tax Amount</th></tr>"
+        f"<tr><td>Residential</td><td>Single Family</td><td>1</td><td>${rng.randint(150, 400)}.00</td></tr>"
+        f"<tr><td>{rng.choice(['Monday', 'Tuesday'])}</td><td>{rng.choice(['Thursday', 'Friday'])}</td>"
+        f"<td>{rng.choice(['Wednesday', 'Saturday'])}</td><td>Collection Days</td></tr></table></div>"
+    )
+    return section_box("Solid Waste (Garbage) Roll Data", body)
+
+
+def real_property_box(rng):
+    body = (
+        '<div id="RPDetails"><table class="appraisalAttributes">'
+        '<tr><th colspan="4">Tag Information</th></tr>'
+        "<tr><th>Decal Number</th><th>Year</th><th>DCA/HUD</th></tr>"
+        f"<tr><td>{rng.randint(10000, 99999)}</td><td>{rng.randint(1980, 2020)}</td><td>Yes</td></tr>"
+        "<tr><th>Make</th><th>Length</th><th>Width</th></tr>"
+        f"<tr><td>PALM HARBOR</td><td>{rng.randint(40, 80)}</td><td>{rng.randint(12, 28)}</td></tr>"
+        "</table></div>"
+    )
+    return section_box("Real Property Tag Information", body)
+
+
+def make_parcel(rng, index):
+    folio_id = str(10000000 + index)
+    number = rng.randint(100, 29999)
+    street = rng.choice(STREETS)
+    city, zip_code = rng.choice(CITIES)
+    use_code, use_description = rng.choice(USE_CODES)
+    owner = f"{rng.choice(SURNAMES)} {rng.choice(GIVEN)}"
+    return {
+        "folio_id": folio_id,
+        "strap": f"{rng.randint(1, 36):02d}-{rng.randint(43, 47)}-{rng.randint(21, 27)}-"
+                 f"{rng.choice(['P2', 'C1', 'L3'])}-{rng.randint(0, 9999):05d}.{rng.randint(0, 9999):04d}",
+        "site_address": f"{number} {street}",
+        "number": str(number),
+        "street": street,
+        "city": city,
+        "zip": zip_code,
+        "owner": owner,
+        "others": f"{rng.choice(SURNAMES)} {rng.choice(GIVEN)}" if rng.random() < 0.4 else "",
+        "use_code": use_code,
+        "use_description": use_description,
+        "legal": f"{rng.choice(SURNAMES)} SUBD BLK {rng.choice('ABCD')} PB {rng.randint(1, 90)} "
+                 f"PG {rng.randint(1, 99)} LOT {rng.randint(1, 60)}",
+    }
+
+
+def generate_page(rng, parcel, max_buildings=4, max_sales=25, max_permits=60, condo_ratio=0.25):
+    buildings = rng.randint(0, max_buildings)
+    condo = parcel["use_code"] == "0400" or rng.random() < condo_ratio
+    sections = [
+        property_data_box(rng, parcel),
+        description_block(rng, parcel),
+        property_details_box(rng, parcel, buildings, condo),
+        trim_box(rng, rng.randint(3, 30)),
+        taxing_box(rng),
+        sales_box(rng, rng.randint(0, max_sales)),
+        permits_box(rng, rng.randint(0, max_permits)),
+        flood_box(rng),
+        garbage_box(rng),
+        real_property_box(rng),
+    ]
+    return (f"<!DOCTYPE html><html><head><title>Lee County Property Appraiser - {parcel['folio_id']}</title>"
+            f"</head><body>{''.join(sections)}</body></html>")
+
+
+def csv_row(parcel):
+    return {
+        "FolioID": parcel["folio_id"], "STRAP": parcel["strap"], "SiteStreetNumber": parcel["number"],
+        "SiteStreetName": parcel["street"], "SiteUnit": "", "SiteCity": parcel["city"], "SiteZIP": parcel["zip"],
+        "OwnerName": parcel["owner"], "Others": parcel["others"], "OwnerAddress1": parcel["site_address"],
+        "OwnerAddress2": "", "OwnerCity": parcel["city"], "OwnerState": "FL", "OwnerZip": parcel["zip"],
+        "OwnerCountry": "",
+    }
+
+
+def generate_corpus(output_folder, count, seed=0, **page_options):
+    """Write `count` pages and a matching parcels.csv into `output_folder`; returns the CSV path."""
+    rng = random.Random(seed)
+    os.makedirs(output_folder, exist_ok=True)
+    csv_path = os.path.join(output_folder, "parcels.csv")
+    with open(csv_path, "w", newline="", encoding="utf-8") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        for index in range(count):
+            parcel = make_parcel(rng, index)
+            with open(os.path.join(output_folder, f"{parcel['folio_id']}.html"), "w", encoding="utf-8") as f:
+                f.write(generate_page(rng, parcel, **page_options))
+            writer.writerow(csv_row(parcel))
+    return csv_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic Lee County parcel pages.")
+    parser.add_argument("--output", default="synthetic_lee", help="Folder to write pages and parcels.csv to")
+    parser.add_argument("--count", type=int, default=500, help="Number of pages to generate")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (same seed, same corpus)")
+    parser.add_argument("--max-buildings", type=int, default=4, help="Maximum buildings per page")
+    parser.add_argument("--max-sales", type=int, default=25, help="Maximum sales rows per page")
+    parser.add_argument("--max-permits", type=int, default=60, help="Maximum permit rows per page")
+    parser.add_argument("--condo-ratio", type=float, default=0.25, help="Share of pages with a condominium section")
+    args = parser.parse_args()
+
+    csv_path = generate_corpus(args.output, args.count, args.seed, max_buildings=args.max_buildings,
+                               max_sales=args.max_sales, max_permits=args.max_permits,
+                               condo_ratio=args.condo_ratio)
+    print(f"Wrote {args.count} pages to {args.output} (county data: {csv_path})")
+
+
+if __name__ == "__main__":
+    main()
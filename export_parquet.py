@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Export the main sections of stage-2 output into typed Parquet tables keyed by
+folio_id, one file per table, for bulk analytics.
+
+Reads either a folder of <folio>.json files or the part-NNNNN.jsonl[.gz]
+shards and index.csv written with --sink jsonl. Records are loaded in batches
+and each batch's columns are converted to numbers and dates with vectorized
+pandas operations before being appended to the table's Parquet file.
+
+    python export_parquet.py --input lee_json --output lee_parquet
+"""
+import argparse
+import csv
+import glob
+import gzip
+import json
+import logging
+import os
+
+import pandas as pd
+from tqdm import tqdm
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.csv"
+
+
+def property_description_rows(data):
+    description = data.get("Property Description") or {}
+    if not description:
+        return []
+    row = dict(description)
+    beds, _, baths = (description.get("Total Bedrooms / Bathrooms") or "").partition("/")
+    row["Bedrooms"], row["Bathrooms"] = beds, baths
+    return [row]
+
+
+def land_tract_rows(data):
+    tracts = (data.get("Property Details") or {}).get("Land Tracts") or []
+    return [tracts] if isinstance(tracts, dict) else tracts
+
+
+def building_rows(data):
+    rows = []
+    for index, building in enumerate((data.get("Property Details") or {}).get("Building Info") or [], 1):
+        characteristics = building.get("Building Characteristics") or {}
+        if characteristics:
+            rows.append(dict(characteristics, Building=str(index)))
+    return rows
+
+
+def section_rows(section):
+    def rows(data):
+        value = data.get(section) or []
+        return [value] if isinstance(value, dict) else value
+    return rows
+
+
+# Table name: (function returning the section's rows for one record,
+#              {column: (key in those rows, type)})
+TABLES = {
+    "property_description": (property_description_rows, {
+        "property_description": ("Property Description", "string"),
+        "gross_living_area": ("Gross Living Area", "number"),
+        "gross_building_area": ("Gross Building Area", "number"),
+        "first_year_on_tax_roll": ("1st Year Building on Tax Roll", "integer"),
+        "bedrooms": ("Bedrooms", "number"),
+        "bathrooms": ("Bathrooms", "number"),
+        "latitude": ("Latitude", "number"),
+        "longitude": ("Longitude>", "number"),
+        "section": ("Section", "string"),
+        "township": ("Township", "string"),
+        "range": ("Range", "string"),
+        "block": ("Block", "string"),
+        "lot": ("Lot", "string"),
+        "municipality": ("Municipality", "string"),
+        "last_inspection_date": ("Last Inspection Date", "date"),
+    }),
+    "land_tracts": (land_tract_rows, {
+        "use_code": ("Use Code", "string"),
+        "use_code_description": ("Use Code Description", "string"),
+        "number_of_units": ("Number of Units", "number"),
+        "unit_of_measure": ("Unit of Measure", "string"),
+    }),
+    "building_characteristics": (building_rows, {
+        "building": ("Building", "integer"),
+        "improvement_type": ("Improvement Type", "string"),
+        "model_type": ("Model Type", "string"),
+        "stories": ("Stories", "number"),
+        "living_units": ("Living Units", "integer"),
+        "bedrooms": ("Bedrooms", "number"),
+        "bathrooms": ("Bathrooms", "number"),
+        "year_built": ("Year Built", "integer"),
+        "effective_year_built": ("Effective Year Built", "integer"),
+    }),
+    "sales": (section_rows("Sales / Transactions"), {
+        "sale_price": ("Sale Price", "number"),
+        "sale_date": ("Date", "date"),
+        "clerk_file_number": ("ClerkFile Number", "string"),
+        "sale_type": ("Type", "string"),
+        "vacant_improved": ("Vacant/Improved", "string"),
+    }),
+    "trim_values": (section_rows("Property Values / Exemptions / TRIM Notices"), {
+        "tax_year": ("Tax Year", "year"),
+        "just": ("Just", "number"),
+        "market_assessed": ("Market Assessed", "number"),
+        "capped_assessed": ("Capped Assessed", "number"),
+        "exemptions": ("Exemptions", "number"),
+        "taxable": ("Taxable", "number"),
+    }),
+    "flood_and_storm": (section_rows("Flood and Storm Information"), {
+        "community": ("Community", "string"),
+        "panel": ("Panel", "string"),
+        "version": ("Version", "string"),
+        "map_date": ("Date", "date"),
+        "evacuation_zone": ("Evacuation Zone", "string"),
+    }),
+}
+
+ARROW_TYPES = {"string": "string", "number": "float64", "integer": "int64", "year": "int64", "date": "date32"}
+
+
+def coerce(values, kind):
+    """Convert a column of extracted strings to `kind`; unparseable values become null."""
+    if kind == "string":
+        return values.astype("string")
+    if kind == "date":
+        return pd.to_datetime(values, format="%m/%d/%Y", errors="coerce")
+    if kind == "year":
+        # "2023 Tax Year" -> 2023, matching the year stage 3 extracts
+        years = values.astype("string").str.extract(r"\b((?:19|20)\d{2})\b", expand=False)
+        return pd.to_numeric(years, errors="coerce").astype("Int64")
+    # "$1,234", "2,752 " -> 1234, 2752
+    numbers = pd.to_numeric(values.astype("string").str.replace(r"[$,\s]", "", regex=True), errors="coerce")
+    if kind == "integer":
+        return numbers.where(numbers % 1 == 0).astype("Int64")
+    return numbers.astype("float64")
+
+
+def table_schema(columns):
+    fields = [pa.field("folio_id", pa.string())]
+    fields += [pa.field(name, getattr(pa, ARROW_TYPES[kind])()) for name, (_, kind) in columns.items()]
+    return pa.schema(fields)
+
+
+def build_frame(folio_ids, rows, columns):
+    """Typed DataFrame of one table for a batch of records."""
+    frame = pd.DataFrame({"folio_id": pd.Series(folio_ids, dtype="string")})
+    for name, (key, kind) in columns.items():
+        frame[name] = coerce(pd.Series([row.get(key) for row in rows], dtype="object"), kind)
+    return frame
+
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def read_records(input_folder):
+    """Yield (folio_id, record) from a stage-2 output folder, JSONL shards or JSON files."""
+    index_path = os.path.join(input_folder, INDEX_FILE)
+    if os.path.exists(index_path):
+        with open(index_path, newline="", encoding="utf-8") as f:
+            # Incremental reruns append a new entry for a reprocessed folio; the last one wins
+            latest = {entry["folio_id"]: entry for entry in csv.DictReader(f)}
+        entries = sorted(latest.values(), key=lambda e: (e["shard"], int(e["offset"])))
+        shard_name, shard = None, None
+        try:
+            for entry in entries:
+                if entry["shard"] != shard_name:
+                    if shard is not None:
+                        shard.close()
+                    shard_name = entry["shard"]
+                    shard = open(os.path.join(input_folder, shard_name), "rb")
+                shard.seek(int(entry["offset"]))
+                payload = shard.read(int(entry["length"]))
+                if shard_name.endswith(".gz"):
+                    payload = gzip.decompress(payload)
+                yield entry["folio_id"], loads(payload)
+        finally:
+            if shard is not None:
+                shard.close()
+        return
+
+    for path in sorted(glob.glob(os.path.join(input_folder, "*.json"))):
+        with open(path, "rb") as f:
+            yield os.path.splitext(os.path.basename(path))[0], loads(f.read())
+
+
+def batches(records, batch_size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export(input_folder, output_folder, batch_size=20000):
+    """Write one <table>.parquet per entry of TABLES; returns {table: rows written}."""
+    os.makedirs(output_folder, exist_ok=True)
+    writers = {}
+    counts = {table: 0 for table in TABLES}
+    try:
+        for batch in tqdm(batches(read_records(input_folder), batch_size), desc="Exporting batches"):
+            for table, (rows_of, columns) in TABLES.items():
+                folio_ids, rows = [], []
+                for folio_id, data in batch:
+                    for row in rows_of(data):
+                        folio_ids.append(folio_id)
+                        rows.append(row)
+                if not rows:
+                    continue
+                schema = table_schema(columns)
+                frame = build_frame(folio_ids, rows, columns)
+                if table not in writers:
+                    writers[table] = pq.ParquetWriter(os.path.join(output_folder, f"{table}.parquet"), schema)
+                writers[table].write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+                counts[table] += len(frame)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return counts
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Export stage-2 output to typed Parquet tables.')
+    parser.add_argument('--input', required=True,
+                        help='Stage-2 output folder (<folio>.json files, or JSONL shards with index.csv)')
+    parser.add_argument('--output', required=True, help='Folder for the <table>.parquet files')
+    parser.add_argument('--batch-size', type=int, default=20000, help='Records converted per batch')
+    args = parser.parse_args()
+    if pa is None:
+        parser.error("exporting needs pyarrow (pip install pyarrow)")
+
+    counts = export(args.input, args.output, args.batch_size)
+    for table, count in counts.items():
+        logger.info(f"{table}: {count} rows")
+
+
+if __name__ == "__main__":
+    main()